@@ -1,21 +1,52 @@
 import os
-import json
 import asyncio
 import re
 import hmac
-from typing import List, Optional, Dict, Any
-
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Body, Request, Depends
+import hashlib
+import threading
+import shutil
+import subprocess
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple, Union
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Request, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from supabase import create_client, Client
-from pypdf import PdfReader
-from openai import OpenAI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ConfigDict, ValidationError
+from supabase import create_client, Client, ClientOptions
+try:
+    import pymupdf  # PyMuPDF: C-backed MuPDF text extraction
+    _MU_PDF_AVAILABLE = True
+except ImportError:
+    _MU_PDF_AVAILABLE = False
+    try:
+        from pypdf import PdfReader  # pure-Python, much slower fallback
+    except ImportError:
+        PdfReader = None
+from openai import OpenAI, AsyncOpenAI
+import orjson
+import httpx
+from cachetools import TTLCache
 import uvicorn
+import aiofiles
+import aiofiles.os
 from dotenv import load_dotenv
 import uuid
 import datetime
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from contextlib import asynccontextmanager
+try:
+    import asyncpg
+except ImportError:  # direct Postgres reads are optional
+    asyncpg = None
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # the shared response cache is optional
+    aioredis = None
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -39,14 +70,163 @@ ALLOWED_ORIGINS = [
     if o.strip()
 ]
 
-if not all([SUPABASE_URL, SUPABASE_KEY, CHATLLM_API_KEY]):
-    raise ValueError("Missing environment variables: SUPABASE_URL, SUPABASE_KEY, CHATLLM_API_KEY")
-
-# Initialize Service Client (Use Service Role Key if available, otherwise fallback to Anon)
+# Service Role Key if available, otherwise fallback to Anon
 SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", SUPABASE_KEY)
-supabase_service: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-# Primary AI Client (RouteLLM / ChatLLM)
-client = OpenAI(api_key=CHATLLM_API_KEY, base_url=CHATLLM_BASE_URL)
+# Optional direct Postgres connection for the read-only endpoints (see get_db_pool)
+DATABASE_URL = os.environ.get("DATABASE_URL")
+# Optional Redis for caching GET responses across workers (see cached_per_user)
+REDIS_URL = os.environ.get("REDIS_URL")
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 60))
+# uvicorn worker processes (see __main__). Every per-process resource below (DB pool, PDF
+# pool, exam semaphore, in-process caches) is multiplied by this, so their defaults are
+# sized as this worker's share of the host. Raise it only together with those limits.
+WEB_CONCURRENCY = max(int(os.environ.get("WEB_CONCURRENCY", 1)), 1)
+
+def check_config():
+    """Fail fast (at startup, not import) when required settings are missing."""
+    if not all([SUPABASE_URL, SUPABASE_KEY, CHATLLM_API_KEY]):
+        raise ValueError("Missing environment variables: SUPABASE_URL, SUPABASE_KEY, CHATLLM_API_KEY")
+
+# Shared clients are built lazily, once per worker process
+# Keep-alive pools (HTTP/2 where the server supports it) shared by the service-side clients,
+# so Supabase and LLM calls reuse warm TLS connections instead of handshaking again.
+HTTP_TIMEOUT = httpx.Timeout(30.0, read=300.0)
+# The LLM clients keep the OpenAI SDK's own default (10 min reads): large-PDF extractions
+# can take that long, and a timeout there means the SDK re-sends the whole prompt.
+LLM_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    return httpx.Client(http2=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+
+@lru_cache(maxsize=1)
+def get_async_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(http2=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+
+@lru_cache(maxsize=1)
+def get_supabase_service() -> Client:
+    """Service Client (bypasses RLS) for background processing and maintenance."""
+    # Shares the HTTP pool with the per-user clients: every sub-client sends its own
+    # credentials with each request, so nothing leaks between them.
+    return create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY, options=ClientOptions(httpx_client=get_http_client()))
+
+@lru_cache(maxsize=1)
+def get_llm_client() -> OpenAI:
+    """Primary AI Client (RouteLLM / ChatLLM)."""
+    return OpenAI(api_key=CHATLLM_API_KEY, base_url=CHATLLM_BASE_URL, timeout=LLM_TIMEOUT, http_client=get_http_client())
+
+@lru_cache(maxsize=1)
+def get_async_llm_client() -> AsyncOpenAI:
+    """Async twin used by background tasks so LLM waits don't pin a threadpool worker."""
+    return AsyncOpenAI(api_key=CHATLLM_API_KEY, base_url=CHATLLM_BASE_URL, timeout=LLM_TIMEOUT, http_client=get_async_http_client())
+
+# Pooled asyncpg connections for the hot read endpoints, created in lifespan when
+# DATABASE_URL is set. These connections bypass RLS: every query on them MUST filter
+# on the authenticated user's id. Without a pool the endpoints use PostgREST as before.
+# Supabase's transaction pooler (port 6543) can't run prepared statements; point
+# DATABASE_URL at the session pooler/direct connection or set DB_STATEMENT_CACHE_SIZE=0.
+_db_pool: Optional["asyncpg.Pool"] = None
+
+async def _init_db_connection(conn):
+    # Decode like PostgREST does: JSON columns to Python objects, UUIDs to strings
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename, schema="pg_catalog",
+            encoder=lambda v: orjson.dumps(v).decode(), decoder=orjson.loads,
+        )
+    await conn.set_type_codec("uuid", schema="pg_catalog", encoder=str, decoder=str, format="text")
+
+async def open_db_pool():
+    global _db_pool
+    if not DATABASE_URL:
+        return
+    if asyncpg is None:
+        print("DATABASE_URL is set but asyncpg is not installed; reading through Supabase.")
+        return
+    _db_pool = await asyncpg.create_pool(
+        dsn=DATABASE_URL,
+        # Defaults are per worker: 20 connections in total across WEB_CONCURRENCY workers
+        min_size=int(os.environ.get("DB_POOL_MIN", max(5 // WEB_CONCURRENCY, 1))),
+        max_size=int(os.environ.get("DB_POOL_MAX", max(20 // WEB_CONCURRENCY, 2))),
+        statement_cache_size=int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100)),
+        init=_init_db_connection,
+    )
+
+def get_db_pool() -> Optional["asyncpg.Pool"]:
+    """The direct Postgres pool, or None when reads go through Supabase."""
+    return _db_pool
+
+# Shared response cache for the read endpoints, connected in lifespan when REDIS_URL is set.
+# Each rendered body is its own key under the user's version of the namespace, so a write
+# drops everything it affects with a single INCR. The TTL bounds staleness for changes
+# made outside the API (cron timeout sweep).
+_redis: Optional["aioredis.Redis"] = None
+
+async def open_redis():
+    global _redis
+    if not REDIS_URL:
+        return
+    if aioredis is None:
+        print("REDIS_URL is set but redis is not installed; response caching disabled.")
+        return
+    _redis = aioredis.from_url(REDIS_URL)
+
+def _cache_version_key(namespace: str, user_id: str) -> str:
+    return f"respver:{namespace}:{user_id}"
+
+async def cached_user_body(namespace: str, user_id: str, field: str, render) -> bytes:
+    """Return a rendered body from Redis, or await render() and cache what it returns.
+
+    Each query is its own key with its own TTL. Keys embed the user's namespace version,
+    which invalidate_user_cache bumps: a body computed before an invalidation is written
+    under the old version and never served again.
+    """
+    if _redis is None:
+        return await render()
+    try:
+        version = int(await _redis.get(_cache_version_key(namespace, user_id)) or 0)
+        key = f"resp:{namespace}:{user_id}:{version}:{field}"
+        body = await _redis.get(key)
+    except Exception as e:
+        # A cache outage must not take the endpoint down with it
+        print(f"Response cache read failed: {e}")
+        return await render()
+    if body is None:
+        body = await render()
+        try:
+            await _redis.set(key, body, ex=RESPONSE_CACHE_TTL, nx=True)
+        except Exception as e:
+            print(f"Response cache write failed: {e}")
+    return body
+
+def cached_per_user(namespace: str):
+    """Cache an endpoint's JSON body per user in Redis. The endpoint must take `dep`."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _redis is None:
+                return await func(*args, **kwargs)
+            field = "&".join(f"{k}={v}" for k, v in sorted(kwargs.items()) if k != "dep")
+
+            async def render() -> bytes:
+                return orjson.dumps(await func(*args, **kwargs), option=orjson.OPT_NON_STR_KEYS)
+
+            body = await cached_user_body(namespace, kwargs["dep"][1].id, field, render)
+            return Response(content=body, media_type="application/json")
+        return wrapper
+    return decorator
+
+async def invalidate_user_cache(user_id: str, *namespaces: str):
+    if _redis is None:
+        return
+    try:
+        async with _redis.pipeline(transaction=False) as pipe:
+            for ns in namespaces:
+                pipe.incr(_cache_version_key(ns, user_id))
+            await pipe.execute()
+    except Exception as e:
+        print(f"Response cache invalidation failed: {e}")
 
 # Rate Limiter
 limiter = Limiter(key_func=get_remote_address)
@@ -60,8 +240,39 @@ PLANNING_MODEL = "deepseek-v3.2"        # Fast, effective planning
 # Upload limits
 MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))  # 25 MB default
 PDF_MAGIC = b"%PDF-"
-
-app = FastAPI(title="DadTutor API")
+UPLOAD_CHUNK_BYTES = 1024 * 1024  # Stream uploads to disk in 1 MiB chunks
+TEMP_DIR = "temp"
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (Rust-backed, emits bytes directly)."""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_config()
+    await open_db_pool()
+    await open_redis()
+    yield
+    # Give in-flight exam pipelines a chance to finish before the worker exits;
+    # anything cut off is later marked failed by the timeout sweep.
+    if _exam_tasks:
+        _, pending = await asyncio.wait(set(_exam_tasks), timeout=EXAM_SHUTDOWN_GRACE)
+        for task in pending:
+            task.cancel()
+    # Close the shared connection pools if this worker ever opened them
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
+    if get_async_http_client.cache_info().currsize:
+        await get_async_http_client().aclose()
+    if get_pdf_pool.cache_info().currsize:
+        get_pdf_pool().shutdown(cancel_futures=True)
+    if _db_pool is not None:
+        await _db_pool.close()
+    if _redis is not None:
+        await _redis.aclose()
+
+app = FastAPI(title="DadTutor API", default_response_class=ORJSONResponse, lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -71,26 +282,52 @@ app.add_middleware(
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
+# Compress large JSON payloads (exam solutions, study guides); tiny responses aren't worth it.
+# Level 6 gets nearly all of the ratio of the default 9 on JSON at a fraction of the CPU.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
 # Authentication & Supabase Client Dependency
+# Per-user clients live no longer than a Supabase JWT (1 hour by default); a refreshed
+# token gets a new client and the old one simply ages out.
+USER_CLIENT_TTL = int(os.environ.get("USER_CLIENT_TTL", 3600))
+_user_clients: TTLCache = TTLCache(maxsize=1024, ttl=USER_CLIENT_TTL)
+
+def _user_client(access_token: str) -> Client:
+    """ Return the cached Supabase client for this JWT, or build one (not cached yet). """
+    # Constructing a client sets up auth/postgrest/storage sub-clients, so reuse it across
+    # the requests of one session. They all run on the shared HTTP pool and send the JWT
+    # with each request, so an evicted client holds no connections of its own.
+    user_client = _user_clients.get(access_token)
+    if user_client is None:
+        user_client = create_client(SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(httpx_client=get_http_client()))
+        user_client.postgrest.auth(access_token)
+        # Also set it for other services like Storage
+        user_client.options.headers["Authorization"] = f"Bearer {access_token}"
+    return user_client
+
+def _cache_user_client(access_token: str, user_client: Client) -> None:
+    """ Keep a client for reuse once its JWT has been verified. """
+    # Caching only verified tokens means random bearer strings cannot evict real sessions;
+    # an existing entry is left alone so its TTL keeps counting from the first request.
+    if access_token not in _user_clients:
+        _user_clients[access_token] = user_client
+
 async def get_supabase(auth: HTTPAuthorizationCredentials = Depends(security)):
     """ Initialize a Supabase client with the user's JWT to respect RLS. """
     access_token = auth.credentials
     try:
-        # Create client with user's specific JWT
-        # This client is local to the request and respects RLS
-        user_client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        user_client.postgrest.auth(access_token)
-        # Also set it for other services like Storage
-        user_client.options.headers["Authorization"] = f"Bearer {access_token}"
+        # Client is bound to the user's specific JWT and respects RLS
+        user_client = _user_client(access_token)
         
-        # Verify user - blocking call, run in thread
+        # Verify user on every request - blocking call, run in thread
         auth_res = await asyncio.to_thread(user_client.auth.get_user, access_token)
         if not auth_res.user:
             raise HTTPException(status_code=401, detail="Invalid session")
-            
+        _cache_user_client(access_token, user_client)
+
         return user_client, auth_res.user, access_token
     except Exception as e:
         print(f"Auth error: {e}")
@@ -109,7 +346,7 @@ async def health_check():
     # Check Supabase
     try:
         # select count is blocking, run in thread
-        await asyncio.to_thread(supabase_service.table("exams").select("count", count="exact").execute)
+        await asyncio.to_thread(get_supabase_service().table("exams").select("count", count="exact").execute)
         status["services"]["supabase"] = "connected"
     except Exception as e:
         status["services"]["supabase"] = f"error: {str(e)}"
@@ -164,7 +401,7 @@ def timeout_sweep():
     """Mark exams stuck in 'processing' for more than 15 minutes as failed. (Admin only - naturally works via cron)"""
     fifteen_mins_ago = (datetime.datetime.now() - datetime.timedelta(minutes=15)).isoformat()
     
-    res = supabase_service.table("exams")\
+    res = get_supabase_service().table("exams")\
         .update({"status": "failed", "error_message": "Verarbeitung abgebrochen (Zeitüberschreitung)"})\
         .eq("status", "processing")\
         .lt("upload_date", fifteen_mins_ago)\
@@ -174,104 +411,318 @@ def timeout_sweep():
 
 # --- Models ---
 
-class GeneratePlanRequest(BaseModel):
-    exam_solutions: List[Dict[str, Any]]
+# Request bodies are read-only once validated. Unknown fields are ignored rather than
+# rejected, since the frontend sends whole objects (e.g. full exam solutions).
+class _RequestModel(BaseModel):
+    model_config = ConfigDict(frozen=True)
 
-class ChatMessage(BaseModel):
+class ExamSolution(_RequestModel):
+    """The parts of an exam solution the study-plan prompt uses (other fields are ignored)."""
+    subject: Optional[str] = None
+    topics: List[str] = []
+    difficulty: Optional[str] = None
+
+class GeneratePlanRequest(_RequestModel):
+    exam_solutions: List[ExamSolution]
+
+class ChatMessage(_RequestModel):
     role: str
     content: str
 
-class FachgespraechRequest(BaseModel):
+class QuestionCtx(_RequestModel):
+    questionNumber: Optional[str] = None
+    questionText: Optional[str] = None
+    topic: Optional[str] = None
+    solution: Optional[str] = None
+
+class FachgespraechRequest(_RequestModel):
     messages: List[ChatMessage]
     context_topic: Optional[str] = None
-    context_questions: Optional[List[Dict[str, Any]]] = None
+    context_questions: Optional[List[QuestionCtx]] = None
+
+class GenerateStudyGuideRequest(_RequestModel):
+    topic: Optional[str] = None
+
+# Schema of the exam analysis requested in EXAM_SYSTEM_PROMPT. Fields are optional and
+# extras are kept so that valid-but-incomplete answers still validate.
+Number = Union[int, float]
+
+class _LLMOutput(BaseModel):
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+class PointsBreakdownItem(_LLMOutput):
+    step: Optional[str] = None
+    pts: Optional[Number] = None
+
+class QuestionPoints(_LLMOutput):
+    total: Optional[Number] = None
+    breakdown: Optional[List[PointsBreakdownItem]] = None
+
+class ExamScenario(_LLMOutput):
+    index: Optional[int] = None
+    contextText: Optional[str] = None
+
+class ExamQuestion(_LLMOutput):
+    questionNumber: Optional[str] = None
+    questionText: Optional[str] = None
+    scenarioIndex: Optional[int] = None
+    type: Optional[str] = None
+    qualificationArea: Optional[str] = None
+    subject: Optional[str] = None
+    topic: Optional[str] = None
+    solution: Optional[str] = None
+    explanation: Optional[str] = None
+    points: Optional[QuestionPoints] = None
+
+class ExamAnalysis(_LLMOutput):
+    subject: Optional[str] = None
+    qualificationArea: Optional[str] = None
+    handlungsbereich: Optional[str] = None
+    year: Optional[str] = None
+    difficulty: Optional[str] = None
+    topics: List[str] = []
+    summary: Optional[str] = None
+    scenarios: List[ExamScenario] = []
+    questions: List[ExamQuestion] = []
 
 # --- PDF Extraction ---
-def extract_text_from_pdf(file_path: str) -> str:
+# Upper bound on PDF text extracted per exam; pages beyond this are never parsed. What is
+# actually sent is trimmed further to EXAM_INPUT_TOKEN_BUDGET.
+MAX_PROMPT_CHARS = 400_000
+PDFTOTEXT_BIN = shutil.which("pdftotext")
+
+# Each pool process is a spawned interpreter that re-imports this module, and every uvicorn
+# worker has its own pool, so the default is this worker's share of the cores. It is also
+# the wave size (page ranges parsed at once) in extract_pdf_text.
+PDF_POOL_WORKERS = int(os.environ.get("PDF_POOL_WORKERS", max((os.cpu_count() or 1) // WEB_CONCURRENCY, 1)))
+# PDFs longer than this are split into page ranges of this size and parsed in parallel
+PDF_PAGES_PER_CHUNK = int(os.environ.get("PDF_PAGES_PER_CHUNK", 50))
+
+@lru_cache(maxsize=1)
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Process pool for CPU-bound PDF work (functions submitted to it must be top-level)."""
+    # spawn: forking a process that already runs event-loop/threadpool threads is unsafe
+    return ProcessPoolExecutor(
+        max_workers=PDF_POOL_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+def _extract_text_with_pdftotext(file_path: str) -> str:
+    """Fallback extractor using poppler's pdftotext binary (if installed)."""
+    if not PDFTOTEXT_BIN:
+        return ""
     try:
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            result = page.extract_text()
-            if result:
-                text += result + "\n"
-        return text
+        result = subprocess.run(
+            [PDFTOTEXT_BIN, "-q", "-enc", "UTF-8", file_path, "-"],
+            capture_output=True, check=True, timeout=60,
+        )
+        return result.stdout.decode("utf-8", "ignore")
     except Exception as e:
-        print(f"Error extracting PDF text: {e}")
+        print(f"Error extracting PDF text with pdftotext: {e}")
         return ""
 
+def iter_pdf_text(file_path: str, max_chars: int = MAX_PROMPT_CHARS, start: int = 0, stop: Optional[int] = None):
+    """Yield the plain text of pages [start, stop), stopping once max_chars have been yielded.
+
+    Pages past the budget are never parsed: anything beyond it would be cut before the
+    LLM call anyway. Pages without text (scans, blank pages) are skipped.
+    """
+    total = 0
+    if _MU_PDF_AVAILABLE:
+        # PyMuPDF's plain "text" mode is the fastest extraction path
+        with pymupdf.open(file_path) as doc:
+            for i in range(start, doc.page_count if stop is None else min(stop, doc.page_count)):
+                page_text = doc[i].get_text("text")
+                if page_text:
+                    yield page_text
+                    total += len(page_text) + 1
+                    if total >= max_chars:
+                        return
+    elif PdfReader is not None:
+        for page in PdfReader(file_path).pages[start:stop]:
+            page_text = page.extract_text()
+            if page_text:
+                yield page_text
+                total += len(page_text) + 1
+                if total >= max_chars:
+                    return
+
+def extract_text_from_pdf(file_path: str, max_chars: int = MAX_PROMPT_CHARS) -> str:
+    """Extract plain text, at most max_chars of it (the prompt budget)."""
+    try:
+        text = "\n".join(iter_pdf_text(file_path, max_chars))[:max_chars]
+        if text.strip():
+            return text
+    except Exception as e:
+        print(f"Error extracting PDF text: {e}")
+    # No usable text; poppler sometimes copes with malformed files
+    return _extract_text_with_pdftotext(file_path)[:max_chars]
+
+def pdf_page_count(file_path: str) -> int:
+    """Page count, or 0 when it can't be had cheaply (callers then parse in one piece)."""
+    if not _MU_PDF_AVAILABLE:
+        return 0
+    try:
+        with pymupdf.open(file_path) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+def extract_pages_from_range(file_path: str, start: int, stop: int, max_chars: int) -> List[str]:
+    """iter_pdf_text for pages [start, stop) only, as a list; runs in a pool worker.
+
+    The range-local budget never cuts a page the global one would keep: the running
+    total over the whole document reaches max_chars no later than this range's does.
+    """
+    return list(iter_pdf_text(file_path, max_chars, start, stop))
+
+async def extract_pdf_text(file_path: str, max_chars: int = MAX_PROMPT_CHARS) -> str:
+    """Extract a PDF's text in the process pool, spreading long documents over its workers.
+
+    Page ranges are parsed a wave (one range per worker) at a time, so work stops soon
+    after max_chars is reached instead of parsing the whole file. Pages are then taken
+    in document order under the same budget as iter_pdf_text, so the result is exactly
+    what extract_text_from_pdf returns for the file.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pdf_pool()
+    page_count = await loop.run_in_executor(pool, pdf_page_count, file_path)
+    if page_count <= PDF_PAGES_PER_CHUNK:
+        return await loop.run_in_executor(pool, extract_text_from_pdf, file_path, max_chars)
+
+    try:
+        ranges = [(i, i + PDF_PAGES_PER_CHUNK) for i in range(0, page_count, PDF_PAGES_PER_CHUNK)]
+        parts = []
+        total = 0
+        budget_reached = False
+        for w in range(0, len(ranges), PDF_POOL_WORKERS):
+            wave = ranges[w:w + PDF_POOL_WORKERS]
+            range_pages = await asyncio.gather(*(
+                loop.run_in_executor(pool, extract_pages_from_range, file_path, start, stop, max_chars)
+                for start, stop in wave
+            ))
+            for pages in range_pages:
+                for page_text in pages:
+                    parts.append(page_text)
+                    total += len(page_text) + 1
+                    if total >= max_chars:
+                        budget_reached = True
+                        break
+                if budget_reached:
+                    # Later pages, including the rest of this wave, are past the budget
+                    break
+            if budget_reached:
+                break
+        text = "\n".join(parts)[:max_chars]
+        if text.strip():
+            return text
+    except Exception as e:
+        print(f"Error extracting PDF text in parallel: {e}")
+    # Let the single-pass extractor (and its pdftotext fallback) have a go
+    return await loop.run_in_executor(pool, extract_text_from_pdf, file_path, max_chars)
+
 # --- NLP PIPELINE: Regex-Based Question Extraction ---
 
-def pre_extract_questions(text: str) -> List[Dict[str, Any]]:
+# --- Regex Patterns (compiled once at import, not per PDF) ---
+# Both patterns stay on stdlib `re`: RE2's \s, \w and \b are ASCII-only, and exam text is
+# German (umlauts, ß, NBSPs), so RE2 would split and classify it differently.
+
+# Pattern 1: Start of a numbered question (1., 2., Q1, Question 1, etc.). Question bodies
+# are the text between consecutive anchors, so the PDF text is scanned once instead of
+# a lazy body + lookahead re-scanning ahead for every candidate. Only horizontal space
+# may precede the number on its line: a run of blank lines is entered at its last
+# newline rather than retried from each one. This pattern is linear on stdlib re already,
+# and stays there: RE2's \s is ASCII-only (PDF text is full of NBSPs), and for this
+# sparse-match scan over a whole document the re2 wrapper's per-match offset conversion
+# made it ~3x slower than `re` on a 1 MB exam text.
+_QUESTION_ANCHOR_RE = re.compile(
+    r'(?:^|\n)[^\S\n]*(?:Q(?:uestion)?\s*)?([0-9]+)[.)]\s*',
+    re.IGNORECASE
+)
+
+# Question-type classifiers fused into one alternation so each candidate is scanned once:
+#   mcq:   MCQ options (a), b), c), d) or A. B. C. D.) followed by option text
+#   tf:    True/False indicators
+#   essay: Essay/Long form ("Discuss", "Explain", "Describe")
+#   short: Short Answer ("Define", "List", "Name", "State")
+# Flags are inline; \b is Unicode-aware on `re`, so "Explainé" or "äDefine" is no keyword.
+_CLASSIFY_RE = re.compile(
+    r'(?i)(?P<mcq>[a-dA-D][\).].)'
+    r'|(?P<tf>\b(?:True\s*(?:\/|or)?\s*False|T\s*\/\s*F)\b)'
+    r'|(?P<essay>\b(?:Discuss|Explain|Describe|Analyze|Evaluate|Compare|Contrast|Justify|Elaborate)\b)'
+    r'|(?P<short>\b(?:Define|List|Name|State|Identify|What is|Give an example)\b)'
+)
+
+# Named group -> question type, in priority order (an MCQ marker anywhere beats a keyword)
+_QUESTION_TYPES = {
+    "mcq": "Multiple Choice",
+    "tf": "True/False",
+    "essay": "Essay",
+    "short": "Short Answer",
+}
+_TYPE_PRIORITY = {group: rank for rank, group in enumerate(_QUESTION_TYPES)}
+
+# Texts shorter than this skip pre-extraction entirely
+MIN_PRE_EXTRACT_CHARS = int(os.environ.get("MIN_PRE_EXTRACT_CHARS", 2000))
+# Cap on candidates passed to the LLM; past this it is reading the raw text regardless
+MAX_QUESTIONS = int(os.environ.get("MAX_QUESTIONS", 500))
+
+# Only the start of a question is classified: option markers and the leading verb sit near
+# the top, and long bodies (tables, scenario text) would otherwise be scanned in full.
+# The type is only a hint; the model re-checks it against the raw text.
+CLASSIFY_HEAD_CHARS = 256
+
+def _classify_question(q_text: str) -> str:
+    """Single scan over the question's head; the highest-priority hit decides the type."""
+    best = None
+    for m in _CLASSIFY_RE.finditer(q_text[:CLASSIFY_HEAD_CHARS]):
+        if best is None or _TYPE_PRIORITY[m.lastgroup] < _TYPE_PRIORITY[best]:
+            best = m.lastgroup
+            if best == "mcq":
+                break
+    return _QUESTION_TYPES[best] if best else "Short Answer"  # Default fallback
+
+@dataclass(slots=True)
+class Candidate:
+    """A question block found by the pre-processor (field names are the prompt's JSON keys)."""
+    questionNumber: str
+    questionText: str
+    type: str
+    source: str = "regex"
+
+def pre_extract_questions(text: str) -> List[Candidate]:
     """
     Uses regex and heuristics to identify potential question blocks.
     Returns a list of candidate questions with metadata.
     """
-    candidates = []
-    
-    # --- Regex Patterns ---
-    # Pattern 1: Numbered questions (1., 2., Q1, Question 1, etc.)
-    numbered_pattern = re.compile(
-        r'(?:^|\n)\s*(?:(?:Q(?:uestion)?\s*)?([0-9]+)[.)]\s*)(.+?)(?=(?:\n\s*(?:Q(?:uestion)?\s*)?[0-9]+[.)])|\Z)',
-        re.IGNORECASE | re.DOTALL
-    )
-    
-    # Pattern 2: MCQ options (a), b), c), d) or A. B. C. D.)
-    mcq_options_pattern = re.compile(
-        r'[\(\[]?[a-dA-D][\).]\s*.+',
-        re.MULTILINE
-    )
-    
-    # Pattern 3: True/False indicators
-    tf_pattern = re.compile(
-        r'\b(?:True\s*(?:\/|or)?\s*False|T\s*\/\s*F)\b',
-        re.IGNORECASE
-    )
+    if len(text) < MIN_PRE_EXTRACT_CHARS:
+        # The model reads a text this short in full anyway; candidates would only add noise
+        return []
 
-    # Pattern 4: Essay/Long form ("Discuss", "Explain", "Describe")
-    essay_keywords_pattern = re.compile(
-        r'\b(?:Discuss|Explain|Describe|Analyze|Evaluate|Compare|Contrast|Justify|Elaborate)\b',
-        re.IGNORECASE
-    )
-    
-    # Pattern 5: Short Answer ("Define", "List", "Name", "State")
-    short_answer_keywords_pattern = re.compile(
-        r'\b(?:Define|List|Name|State|Identify|What is|Give an example)\b',
-        re.IGNORECASE
-    )
+    candidates = []
 
     # --- Extraction ---
-    matches = numbered_pattern.findall(text)
-    
-    for i, match in enumerate(matches):
-        q_num = match[0].strip()
-        q_text = match[1].strip()
-        
-        # Trim excessive whitespace/newlines within question text
-        q_text = re.sub(r'\s+', ' ', q_text)
-        
+    # Split on question anchors: each body runs from one anchor's end to the next one's
+    # start. Anchors are streamed, so a cut-off at MAX_QUESTIONS also stops the scan.
+    anchors = _QUESTION_ANCHOR_RE.finditer(text)
+    m = next(anchors, None)
+    while m is not None and len(candidates) < MAX_QUESTIONS:
+        next_m = next(anchors, None)
+        body_end = next_m.start() if next_m is not None else len(text)
+        body_start = m.end()
+        q_num = m.group(1)
+        m = next_m
+        # Cleaning never lengthens a body, so a span this short can be rejected unsliced
+        if body_end - body_start < 10:
+            continue
+        # Collapse whitespace runs (incl. Unicode spaces such as NBSP) to single spaces;
+        # str.split() is the same whitespace set as re's \s, in one C-level pass
+        q_text = " ".join(text[body_start:body_end].split())
+
         if len(q_text) < 10:  # Skip fragments too short to be questions
             continue
 
-        # --- Classify Question Type ---
-        q_type = "Unknown"
-        if mcq_options_pattern.search(q_text):
-            q_type = "Multiple Choice"
-        elif tf_pattern.search(q_text):
-            q_type = "True/False"
-        elif essay_keywords_pattern.search(q_text):
-            q_type = "Essay"
-        elif short_answer_keywords_pattern.search(q_text):
-            q_type = "Short Answer"
-        else:
-            q_type = "Short Answer"  # Default fallback
-            
-        candidates.append({
-            "questionNumber": q_num,
-            "questionText": q_text,
-            "type": q_type,
-            "source": "regex"
-        })
+        candidates.append(Candidate(q_num, q_text, _classify_question(q_text)))
         
     # Fallback: If regex finds very few questions, the raw text will still be sent to AI.
     if len(candidates) < 2:
@@ -284,28 +735,35 @@ def pre_extract_questions(text: str) -> List[Dict[str, Any]]:
     return candidates
 
 # --- JSON Parsing ---
+# A fenced block (```json or a bare ```), else the outermost {...} span
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
 def parse_json_from_markdown(text: str):
+    # json_object responses are normally bare JSON, so the first parse usually wins;
+    # orjson rejects anything else at the first non-JSON character.
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
         pass
-    
-    try:
-        start = text.find("```json")
-        if start != -1:
-            end = text.find("```", start + 7)
-            if end != -1:
-                json_str = text[start+7:end].strip()
-                return json.loads(json_str)
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-            json_str = text[start:end+1]
-            return json.loads(json_str)
-    except Exception as e:
-        print(f"JSON Parsing failed: {e}")
+
+    for pattern in (_JSON_FENCE_RE, _JSON_OBJECT_RE):
+        m = pattern.search(text)
+        if m:
+            try:
+                return orjson.loads(m.group(m.lastindex or 0))
+            except orjson.JSONDecodeError as e:
+                print(f"JSON Parsing failed: {e}")
     return {}
 
+def parse_exam_analysis(text: str) -> Dict[str, Any]:
+    """Validate the extraction model's JSON against ExamAnalysis in one pass."""
+    try:
+        return ExamAnalysis.model_validate_json(text).model_dump(exclude_unset=True)
+    except ValidationError:
+        # Not schema-conformant JSON; recover what we can the lenient way
+        return parse_json_from_markdown(text)
+
 # --- Prompts ---
 
 # Official IHK Taxonomy for Industriemeister Elektrotechnik
@@ -445,6 +903,15 @@ Output valid JSON matching this schema:
 }
 """
 
+# Static system messages are sent verbatim on every call. Keeping them byte-identical
+# and ahead of any per-request content lets the provider's prompt (prefix) cache hit.
+EXAM_SYSTEM_MESSAGE = (
+    "You are a helpful tutor that extraction information into clean JSON. "
+    "Your response must be ONLY the JSON object, no conversational text.\n"
+    + EXAM_SYSTEM_PROMPT
+)
+PLAN_SYSTEM_MESSAGE = "You are a helpful assistant that outputs JSON.\n" + PLAN_SYSTEM_PROMPT
+
 FACHGESPRAECH_SYSTEM_PROMPT = """
 You are a member of the "Prüfungsausschuss" (Examination Board) for the German "Industriemeister Elektrotechnik IHK" qualification. 
 Your role is to simulate the "Fachgespräch" (oral technical discussion/defense).
@@ -462,18 +929,13 @@ INSTRUCTIONS:
 4.  **Feedback**: Provide subtle hints if they are stuck, but encourage them to find the answer themselves.
 5.  **Grading**: After several exchanges, if you feel they have demonstrated competence or failure, provide a brief evaluation of their "Handlungskompetenz" (ability to act/competence) in German.
 
-CURRENT CONTEXT:
-Topic: {topic}
-
 RESPONSE GUIDELINE:
 Keep responses concise, professional, and entirely in German.
+The current topic is given in the following system message.
 """
 
 STUDY_GUIDE_PROMPT = """
-You are an expert tutor. Based on the following exam questions about "{topic}", create a comprehensive study guide / cheat sheet in German (Deutsch).
-
-QUESTIONS ABOUT THIS TOPIC:
-{questions}
+You are an expert tutor. Based on the exam questions about the topic given in the user message, create a comprehensive study guide / cheat sheet in German (Deutsch).
 
 Create a study guide that includes:
 
@@ -513,105 +975,192 @@ Output valid JSON matching this schema:
   "quickTips": ["String", "String"]
 }
 """
+STUDY_GUIDE_SYSTEM_MESSAGE = "You are a helpful assistant that outputs JSON.\n" + STUDY_GUIDE_PROMPT
 
 # --- Background Task ---
 
-def process_exam_background(exam_id: str, file_path: str, user_id: str, access_token: str):
-    """Background task to process the uploaded PDF using AI."""
-    print(f"Processing exam {exam_id} for user {user_id}...")
-    # Use the service client (bypasses RLS for the processing state)
-    supabase_service.table("exams").update({"status": "processing"}).eq("id", exam_id).execute()
-
-    try:
-        raw_text = extract_text_from_pdf(file_path)
-        if not raw_text:
-            raise ValueError("Could not extract text from PDF")
+# Bound concurrent exam pipelines per worker: each holds a PDF's text in memory plus an LLM call.
+# The default splits 4 host-wide slots across the WEB_CONCURRENCY workers.
+MAX_CONCURRENT_EXAMS = int(os.environ.get("MAX_CONCURRENT_EXAMS", max(4 // WEB_CONCURRENCY, 1)))
+# Running + waiting jobs beyond which new uploads/retries are rejected with 429
+JOB_QUEUE_MAX = int(os.environ.get("JOB_QUEUE_MAX", 20))
+# Seconds to let running exams finish on shutdown
+EXAM_SHUTDOWN_GRACE = float(os.environ.get("EXAM_SHUTDOWN_GRACE", 30))
+EXAM_SEM = asyncio.Semaphore(MAX_CONCURRENT_EXAMS)
+# Strong references to in-flight exam tasks (the loop itself only keeps weak ones)
+_exam_tasks: set = set()
+
+def _check_exam_queue():
+    """Reject new work early when this worker's exam queue is full."""
+    if len(_exam_tasks) >= JOB_QUEUE_MAX:
+        raise HTTPException(
+            status_code=429,
+            detail="Zu viele Prüfungen in Verarbeitung. Bitte versuchen Sie es in Kürze erneut.",
+        )
 
-        # --- NLP Pre-Processing Step ---
-        candidate_questions = pre_extract_questions(raw_text)
-        candidates_json_str = json.dumps(candidate_questions, indent=2) if candidate_questions else "(None found by pre-processor)"
+def _enqueue_exam(exam_id: str, file_path: str, user_id: str, access_token: str):
+    """Schedule the pipeline as its own event-loop task, independent of the request."""
+    task = asyncio.create_task(process_exam_background(exam_id, file_path, user_id, access_token))
+    _exam_tasks.add(task)
+    task.add_done_callback(_exam_tasks.discard)
+
+async def process_exam_background(exam_id: str, file_path: str, user_id: str, access_token: str):
+    """Run the exam pipeline, waiting for a free EXAM_SEM slot first."""
+    async with EXAM_SEM:
+        await _process_exam(exam_id, file_path, user_id, access_token)
+
+# Input-token budget for one extraction call (system prompt + candidates + PDF text),
+# leaving the rest of the model's context for its answer. There is no tokenizer for the
+# routed models here, so tokens are estimated from characters. CHARS_PER_TOKEN is the
+# starting ratio (German exam text runs at roughly 3); each completed call then refines
+# it from the prompt_tokens the provider reports.
+EXAM_INPUT_TOKEN_BUDGET = int(os.environ.get("EXAM_INPUT_TOKEN_BUDGET", 100_000))
+CHARS_PER_TOKEN = float(os.environ.get("CHARS_PER_TOKEN", 3.0))
+_chars_per_token = CHARS_PER_TOKEN
+# At most this share of what the system prompt leaves goes to the candidate list; the
+# PDF text always keeps the rest, however many questions the pre-processor found. The
+# candidates are slices of that same text, so it gets by far the larger share.
+CANDIDATES_TOKEN_SHARE = 0.2
+
+def _calibrate_chars_per_token(prompt_chars: int, usage) -> None:
+    """Fold one call's measured ratio into the running estimate (moving average)."""
+    global _chars_per_token
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if not prompt_tokens or prompt_chars < 1000:
+        return  # tiny prompts are dominated by per-message overhead
+    observed = min(max(prompt_chars / prompt_tokens, 1.5), 6.0)
+    _chars_per_token = 0.8 * _chars_per_token + 0.2 * observed
+
+def _estimate_tokens(text: str) -> int:
+    return int(len(text) / _chars_per_token) + 1
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens, at the last whitespace so no word is split."""
+    max_chars = int(max(max_tokens, 0) * _chars_per_token)
+    if len(text) <= max_chars:
+        return text
+    cut = max(text.rfind(" ", 0, max_chars), text.rfind("\n", 0, max_chars))
+    return text[:cut if cut > 0 else max_chars]
 
-        print(f"Calling {EXTRACTION_MODEL} for exam {exam_id}...")
-        
-        full_prompt = f"""{EXAM_SYSTEM_PROMPT}
+def _candidates_to_json(candidates: List[Candidate], max_tokens: int, from_end: bool = False) -> Tuple[str, int]:
+    """Serialize as many candidates as fit in max_tokens; returns (json, kept).
 
---- CANDIDATE_QUESTIONS (from NLP pre-processor) ---
-{candidates_json_str}
+    Leading candidates are kept first, or trailing ones with from_end (still in order).
+    """
+    # Compact JSON: indentation costs tokens and the model does not need it
+    items = [orjson.dumps(c) for c in candidates]
+    max_chars = int(max(max_tokens, 0) * _chars_per_token) - 2  # the enclosing brackets
+    kept, size = 0, 0
+    for item in (reversed(items) if from_end else items):
+        size += len(item) + (1 if kept else 0)
+        if size > max_chars:
+            break
+        kept += 1
+    items = items[len(items) - kept:] if from_end else items[:kept]
+    return (b"[" + b",".join(items) + b"]").decode(), kept
+
+# Only per-exam data goes in the user turn; the static instructions live in
+# EXAM_SYSTEM_MESSAGE so the provider can reuse its cached prefix.
+EXAM_USER_PROMPT = """--- CANDIDATE_QUESTIONS (from NLP pre-processor) ---
+{candidates}
 
 --- RAW TEXT (verify and find any missed questions) ---
-{raw_text[:400000]}
+{text}
 """
+
+def _build_exam_prompt(exam_id: str, raw_text: str, candidates: List[Candidate]) -> str:
+    """The extraction call's user turn: candidates plus as much PDF text as the budget allows."""
+    # The candidates get up to their share of what the system prompt and the section
+    # headers leave of the budget; the PDF text gets everything they do not use
+    available = EXAM_INPUT_TOKEN_BUDGET - _estimate_tokens(EXAM_SYSTEM_MESSAGE) - _estimate_tokens(EXAM_USER_PROMPT)
+    candidate_budget = int(available * CANDIDATES_TOKEN_SHARE)
+    if candidates:
+        # When the text will be cut, questions past the cut only reach the model as
+        # candidates, so keep the trailing ones: the leading ones are in the text anyway
+        text_cut = _estimate_tokens(raw_text) > available - candidate_budget
+        # orjson serializes the slotted Candidate dataclasses natively
+        candidates_json_str, kept = _candidates_to_json(candidates, candidate_budget, from_end=text_cut)
+        if kept < len(candidates):
+            print(f"Exam {exam_id}: candidate list cut to the {'last' if text_cut else 'first'} {kept}/{len(candidates)} questions.")
+    else:
+        candidates_json_str = "(None found by pre-processor)"
+    text_budget = available - _estimate_tokens(candidates_json_str)
+    prompt_text = _truncate_to_tokens(raw_text, text_budget)
+    if len(prompt_text) < len(raw_text):
+        print(f"Exam {exam_id}: PDF text cut to ~{text_budget} tokens ({len(prompt_text)}/{len(raw_text)} chars).")
+    return EXAM_USER_PROMPT.format(candidates=candidates_json_str, text=prompt_text)
+
+def _exam_content_hash(raw_text: str) -> str:
+    """Cache key for an exam analysis: the extracted text plus everything that shapes the answer."""
+    h = hashlib.sha256()
+    for part in (EXTRACTION_MODEL, EXAM_SYSTEM_MESSAGE, raw_text):
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def _is_reusable_analysis(raw_json: Any) -> bool:
+    """Only analyses that actually found questions are worth serving from the cache."""
+    return isinstance(raw_json, dict) and bool(raw_json.get("questions"))
+
+def _find_cached_analysis(user_id: str, content_hash: str, exam_id: str) -> Optional[Dict[str, Any]]:
+    """Return the user's earlier analysis of identical exam text, if there is one.
+
+    The exam's own plan is skipped, so a retry always gets a fresh analysis.
+    """
+    res = get_supabase_service().table("study_plans").select("raw_json") \
+        .eq("user_id", user_id).eq("content_hash", content_hash).neq("exam_id", exam_id) \
+        .not_.is_("raw_json", "null").order("created_at", desc=True).limit(5).execute()
+    return next((row["raw_json"] for row in res.data if _is_reusable_analysis(row["raw_json"])), None)
+
+async def _process_exam(exam_id: str, file_path: str, user_id: str, access_token: str):
+    """Background task to process the uploaded PDF using AI."""
+    print(f"Processing exam {exam_id} for user {user_id}...")
+    # The exam is already 'processing' (set by upload/retry before enqueueing).
+    # Writes use the service client (bypasses RLS); supabase-py is blocking, so every
+    # call runs in a thread to keep the event loop free.
+    try:
+        # PDF parsing is CPU-bound and holds the GIL; it runs in the process pool so
+        # concurrent exams (and page ranges of long ones) parse on separate cores
+        loop = asyncio.get_running_loop()
+        raw_text = await extract_pdf_text(file_path)
+        if not raw_text:
+            raise ValueError("Could not extract text from PDF")
+
+        # Re-uploads of the same PDF reuse the earlier analysis instead of another LLM call
+        content_hash = _exam_content_hash(raw_text)
+        ai_output = await asyncio.to_thread(_find_cached_analysis, user_id, content_hash, exam_id)
+        if ai_output is not None:
+            print(f"Reusing cached analysis for exam {exam_id}.")
+        else:
+            # --- NLP Pre-Processing Step ---
+            # The regex pass is CPU-bound too, so it shares the pool instead of blocking the loop
+            candidate_questions = await loop.run_in_executor(get_pdf_pool(), pre_extract_questions, raw_text)
+            print(f"Calling {EXTRACTION_MODEL} for exam {exam_id}...")
+            full_prompt = _build_exam_prompt(exam_id, raw_text, candidate_questions)
+
+            response = await get_async_llm_client().chat.completions.create(
+                model=EXTRACTION_MODEL,
+                messages=[
+                    {"role": "system", "content": EXAM_SYSTEM_MESSAGE},
+                    {"role": "user", "content": full_prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+            _calibrate_chars_per_token(len(EXAM_SYSTEM_MESSAGE) + len(full_prompt), response.usage)
+
+            ai_output = parse_exam_analysis(response.choices[0].message.content)
         
-        response = client.chat.completions.create(
-            model=EXTRACTION_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful tutor that extraction information into clean JSON. Your response must be ONLY the JSON object, no conversational text."},
-                {"role": "user", "content": full_prompt}
-            ]
-        )
-        
-        ai_output = parse_json_from_markdown(response.choices[0].message.content)
-        
-        # Save solution
-        study_plan_data = {
-            "exam_id": exam_id,
-            "user_id": user_id,
-            "raw_json": ai_output,
-            "markdown_plan": ai_output.get("summary", "Processed successfully")
-        }
-        
-        # Delete-then-insert avoids relying on a UNIQUE(exam_id) constraint that may not exist in older DBs.
-        supabase_service.table("study_plans").delete().eq("exam_id", exam_id).execute()
-        supabase_service.table("study_plans").insert(study_plan_data).execute()
-
-        # Get specialization from settings
-        settings_res = supabase_service.table("user_settings").select("specialization").eq("user_id", user_id).execute()
-        user_specialization = settings_res.data[0]['specialization'] if settings_res.data else None
-
-        # Update exam record
-        supabase_service.table("exams").update({
-            "status": "completed",
-            "qualification_area": ai_output.get("qualificationArea"),
-            "handlungsbereich": ai_output.get("handlungsbereich"),
-            "specialization": user_specialization
-        }).eq("id", exam_id).execute()
-
-        # Clear any prior scenarios/questions so retries are idempotent
-        supabase_service.table("questions").delete().eq("exam_id", exam_id).execute()
-        supabase_service.table("scenarios").delete().eq("exam_id", exam_id).execute()
-
-        # Save Scenarios
-        scenario_map = {}
-        for ai_scenario in ai_output.get("scenarios", []):
-            scenario_data = {
-                "exam_id": exam_id,
-                "user_id": user_id,
-                "context_text": ai_scenario.get("contextText"),
-                "order": ai_scenario.get("index", 0)
-            }
-            s_res = supabase_service.table("scenarios").insert(scenario_data).execute()
-            if s_res.data:
-                scenario_map[ai_scenario.get("index")] = s_res.data[0]['id']
-
-        # Save Questions
-        for ai_q in ai_output.get("questions", []):
-            scenario_idx = ai_q.get("scenarioIndex")
-            q_data = {
-                "exam_id": exam_id,
-                "user_id": user_id,
-                "scenario_id": scenario_map.get(scenario_idx) if scenario_idx is not None else None,
-                "question_number": ai_q.get("questionNumber"),
-                "question_text": ai_q.get("questionText"),
-                "type": ai_q.get("type"),
-                "qualification_area": ai_q.get("qualificationArea"),
-                "subject": ai_q.get("subject"),
-                "topic": ai_q.get("topic"),
-                "solution": ai_q.get("solution"),
-                "explanation": ai_q.get("explanation"),
-                "points_total": ai_q.get("points", {}).get("total"),
-                "points_breakdown": ai_q.get("points", {}).get("breakdown")
-            }
-            supabase_service.table("questions").insert(q_data).execute()
+        # Study plan, exam status/metadata, scenarios and questions are written by one
+        # Postgres function (see schema.sql) in a single round-trip and transaction.
+        # Empty or unparseable output is stored without a hash so it is never reused.
+        await asyncio.to_thread(get_supabase_service().rpc("finalize_exam", {
+            "p_exam_id": exam_id,
+            "p_user_id": user_id,
+            "p_raw_json": ai_output,
+            "p_content_hash": content_hash if _is_reusable_analysis(ai_output) else None,
+        }).execute)
+        await _invalidate_solution(user_id, exam_id)
+        await invalidate_user_cache(user_id, "exams", "topics")
         
         print(f"Exam {exam_id} processed successfully.")
             
@@ -623,15 +1172,16 @@ def process_exam_background(exam_id: str, file_path: str, user_id: str, access_t
             error_msg = "KI-Nutzungslimit überschritten (Quote). Bitte versuchen Sie es später erneut."
         elif "500" in error_msg and "Google" in error_msg:
             error_msg = "KI-Dienstfehler. Bitte versuchen Sie es erneut."
-            
-        supabase_service.table("exams").update({
+
+        await asyncio.to_thread(get_supabase_service().table("exams").update({
             "status": "failed",
             "error_message": error_msg[:1000]
-        }).eq("id", exam_id).execute()
+        }).eq("id", exam_id).execute)
+        await invalidate_user_cache(user_id, "exams")
 
     finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        if await aiofiles.os.path.exists(file_path):
+            await aiofiles.os.remove(file_path)
 
 # --- Endpoints ---
 
@@ -643,31 +1193,39 @@ def _safe_filename(name: Optional[str]) -> str:
         base += ".pdf"
     return base[:128] or "upload.pdf"
 
+def _new_temp_pdf(prefix: str = "upload_") -> str:
+    """Atomically create a uniquely named temp file for a PDF and return its path."""
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    # The name never contains client input, so there is nothing to traverse or collide on
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".pdf", dir=TEMP_DIR)
+    os.close(fd)
+    return path
+
 
 @app.post("/upload")
 @limiter.limit("10/hour")
 async def upload_exam(
     request: Request,
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...), 
     dep: tuple = Depends(get_supabase)
 ):
     supabase, user, access_token = dep
+    _check_exam_queue()
     declared_ct = (file.content_type or "").lower()
     if declared_ct and declared_ct not in ("application/pdf", "application/x-pdf"):
         raise HTTPException(status_code=415, detail="Nur PDF-Dateien werden unterstützt.")
 
     safe_name = _safe_filename(file.filename)
 
-    os.makedirs("temp", exist_ok=True)
-    local_path = f"temp/{uuid.uuid4()}_{safe_name}"
+    local_path = _new_temp_pdf()
 
     total = 0
     header_checked = False
     try:
-        with open(local_path, "wb") as f:
+        # aiofiles keeps the chunked disk writes off the event loop
+        async with aiofiles.open(local_path, "wb") as f:
             while True:
-                chunk = await file.read(1024 * 1024)
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
                 if not chunk:
                     break
                 if not header_checked:
@@ -677,7 +1235,7 @@ async def upload_exam(
                 total += len(chunk)
                 if total > MAX_UPLOAD_BYTES:
                     raise HTTPException(status_code=413, detail="Datei zu groß.")
-                f.write(chunk)
+                await f.write(chunk)
 
         storage_path = f"exams/{user.id}/{uuid.uuid4()}_{safe_name}"
         # Upload to Supabase Storage (blocking, run in thread)
@@ -688,7 +1246,8 @@ async def upload_exam(
             "user_id": user.id,
             "filename": safe_name,
             "storage_path": storage_path,
-            "status": "uploading",
+            # Inserted as 'processing' so the pipeline needn't write the status again
+            "status": "processing",
         }
         # Insert into database (blocking, run in thread)
         res = await asyncio.to_thread(supabase.table("exams").insert(exam_data).execute)
@@ -696,7 +1255,8 @@ async def upload_exam(
             raise HTTPException(status_code=500, detail="Failed to insert into DB")
 
         exam_id = res.data[0]["id"]
-        background_tasks.add_task(process_exam_background, exam_id, local_path, user.id, access_token)
+        _enqueue_exam(exam_id, local_path, user.id, access_token)
+        await invalidate_user_cache(user.id, "exams")
 
         return {"message": "Upload successful", "exam_id": exam_id}
     except Exception as e:
@@ -705,41 +1265,109 @@ async def upload_exam(
         if isinstance(e, HTTPException): raise e
         raise HTTPException(status_code=500, detail=str(e))
 
+# Columns the dashboard needs for the exam list (see frontend getExams)
+EXAM_LIST_COLUMNS = "id,filename,status,upload_date,error_message"
+
 @app.get("/exams")
-def list_exams(dep: tuple = Depends(get_supabase)):
+@cached_per_user("exams")
+async def list_exams(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    dep: tuple = Depends(get_supabase),
+):
     supabase, user, _ = dep
-    res = supabase.table("exams").select("*").order("upload_date", desc=True).execute()
+    if (pool := get_db_pool()) is not None:
+        rows = await pool.fetch(
+            f"SELECT {EXAM_LIST_COLUMNS} FROM exams WHERE user_id = $1"
+            " ORDER BY upload_date DESC LIMIT $2 OFFSET $3",
+            user.id, limit, offset,
+        )
+        return [dict(r) for r in rows]
+    res = await asyncio.to_thread(supabase.table("exams").select(EXAM_LIST_COLUMNS)\
+        .order("upload_date", desc=True)\
+        .range(offset, offset + limit - 1)\
+        .execute)
     return res.data
 
 @app.post("/retry/{exam_id}")
-async def retry_exam(exam_id: str, background_tasks: BackgroundTasks, dep: tuple = Depends(get_supabase)):
+async def retry_exam(exam_id: str, dep: tuple = Depends(get_supabase)):
     supabase, user, access_token = dep
+    _check_exam_queue()
     res = supabase.table("exams").select("*").eq("id", exam_id).single().execute()
     if not res.data:
         raise HTTPException(status_code=404, detail="Exam not found")
+    await _invalidate_solution(user.id, exam_id)
     
     exam = res.data
     storage_path = exam['storage_path']
-    
-    if not os.path.exists("temp"):
-        os.makedirs("temp")
-    
-    local_path = f"temp/retry_{uuid.uuid4()}_{exam['filename']}"
+
+    local_path = _new_temp_pdf(prefix="retry_")
     try:
         # Download in thread to avoid blocking event loop
         content = await asyncio.to_thread(supabase.storage.from_("exams").download, storage_path)
-        with open(local_path, "wb+") as f:
-            f.write(content)
+        async with aiofiles.open(local_path, "wb") as f:
+            await f.write(content)
     except Exception as e:
+        if os.path.exists(local_path):
+            os.remove(local_path)
         raise HTTPException(status_code=500, detail=f"Failed to download: {e}")
 
-    supabase.table("exams").update({"status": "processing", "error_message": None}).eq("id", exam_id).execute()
-    background_tasks.add_task(process_exam_background, exam_id, local_path, user.id, access_token)
+    await asyncio.to_thread(
+        supabase.table("exams").update({"status": "processing", "error_message": None}).eq("id", exam_id).execute
+    )
+    _enqueue_exam(exam_id, local_path, user.id, access_token)
+    await invalidate_user_cache(user.id, "exams")
     return {"message": "Retry started", "exam_id": exam_id}
 
+# Rendered /solutions bodies, dropped when an exam is reprocessed or deleted. They live in
+# Redis (shared by all workers, versioned per exam) when REDIS_URL is set. Otherwise an
+# in-process cache keyed by (user_id, exam_id) is only used with a single worker: another
+# worker would not see a retry or delete and would keep serving the old body.
+SOLUTION_CACHE_TTL = int(os.environ.get("SOLUTION_CACHE_TTL", 300))
+_solution_cache: TTLCache = TTLCache(maxsize=2048, ttl=SOLUTION_CACHE_TTL)
+_solution_cache_lock = threading.Lock()
+# Per-user data: browsers may keep it but must revalidate (cheap 304) before reuse
+SOLUTION_CACHE_CONTROL = "private, no-cache"
+
+def _solution_namespace(exam_id: str) -> str:
+    return f"solutions:{exam_id}"
+
+async def _invalidate_solution(user_id: str, exam_id: str):
+    with _solution_cache_lock:
+        _solution_cache.pop((user_id, exam_id), None)
+    await invalidate_user_cache(user_id, _solution_namespace(exam_id))
+
+async def _solution_body(supabase: Client, user_id: str, exam_id: str) -> bytes:
+    async def render() -> bytes:
+        solution = await asyncio.to_thread(_load_solution, supabase, exam_id)
+        return orjson.dumps(solution, option=orjson.OPT_NON_STR_KEYS)
+
+    if _redis is not None:
+        return await cached_user_body(_solution_namespace(exam_id), user_id, "", render)
+    if WEB_CONCURRENCY > 1:
+        return await render()
+    cache_key = (user_id, exam_id)
+    with _solution_cache_lock:
+        body = _solution_cache.get(cache_key)
+    if body is None:
+        body = await render()
+        with _solution_cache_lock:
+            _solution_cache[cache_key] = body
+    return body
+
 @app.get("/solutions/{exam_id}")
-def get_solution(exam_id: str, dep: tuple = Depends(get_supabase)):
+async def get_solution(exam_id: str, request: Request, dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
+    body = await _solution_body(supabase, user.id, exam_id)
+    # Derived from the body itself, so a 304 can only confirm what would be sent anyway
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": SOLUTION_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (t.strip() for t in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _load_solution(supabase: Client, exam_id: str) -> Dict[str, Any]:
     exam_res = supabase.table("exams").select("*").eq("id", exam_id).execute()
     if not exam_res.data:
         raise HTTPException(status_code=404, detail="Exam not found or no access")
@@ -801,17 +1429,18 @@ def get_solution(exam_id: str, dep: tuple = Depends(get_supabase)):
 @limiter.limit("5/hour")
 async def generate_plan(request: Request, body: GeneratePlanRequest, dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
-    papers_summary = ""
-    for p in body.exam_solutions:
-        papers_summary += f"Subject: {p.get('subject', 'Unknown')}, Topics: {', '.join(p.get('topics', []))}, Difficulty: {p.get('difficulty', 'Unknown')}\n"
+    papers_summary = "".join(
+        f"Subject: {p.subject or 'Unknown'}, Topics: {', '.join(p.topics)}, Difficulty: {p.difficulty or 'Unknown'}\n"
+        for p in body.exam_solutions
+    )
 
     try:
         print(f"Generating plan for {user.id} using {PLANNING_MODEL}...")
-        response = client.chat.completions.create(
+        response = get_llm_client().chat.completions.create(
             model=PLANNING_MODEL,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
-                {"role": "user", "content": f"{PLAN_SYSTEM_PROMPT}\n\nData:\n{papers_summary}"}
+                {"role": "system", "content": PLAN_SYSTEM_MESSAGE},
+                {"role": "user", "content": f"Data:\n{papers_summary}"}
             ],
             response_format={"type": "json_object"}
         )
@@ -828,7 +1457,7 @@ async def generate_plan(request: Request, body: GeneratePlanRequest, dep: tuple
 
 # --- Practice Progress Endpoints ---
 
-class PracticeSessionCreate(BaseModel):
+class PracticeSessionCreate(_RequestModel):
     exam_id: str
     exam_name: str
     total_questions: int
@@ -837,69 +1466,124 @@ class PracticeSessionCreate(BaseModel):
     score_percentage: int
 
 @app.post("/progress/sessions")
-def save_practice_session(session: Dict[str, Any], dep: tuple = Depends(get_supabase)):
+async def save_practice_session(session: PracticeSessionCreate, dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
-    session["user_id"] = user.id
-    res = supabase.table("practice_sessions").insert(session).execute()
+    row = {**session.model_dump(), "user_id": user.id}
+    res = await asyncio.to_thread(supabase.table("practice_sessions").insert(row).execute)
     if not res.data:
         raise HTTPException(status_code=500, detail="Failed to save session")
+    await invalidate_user_cache(user.id, "progress")
     return {"session_id": res.data[0]["id"]}
 
+# Direct-pool twins of the progress_totals() / list_topics() functions in schema.sql
+PROGRESS_TOTALS_SQL = (
+    "SELECT COALESCE(SUM(total_questions), 0) AS attempted, COALESCE(SUM(correct_count), 0) AS mastered"
+    " FROM practice_sessions WHERE user_id = $1"
+)
+TOPICS_SQL = (
+    "SELECT topic FROM questions WHERE user_id = $1 AND topic <> ''"
+    ' GROUP BY topic ORDER BY topic COLLATE "C"'
+)
+
 @app.get("/progress")
-def get_progress(dep: tuple = Depends(get_supabase)):
+@cached_per_user("progress")
+async def get_progress(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    dep: tuple = Depends(get_supabase),
+):
     supabase, user, _ = dep
-    # RLS ensures we only get our own sessions
-    res = supabase.table("practice_sessions").select("*").order("session_date", desc=True).execute()
-    sessions = res.data or []
-    
-    total_q = sum(s.get("total_questions", 0) for s in sessions)
-    correct = sum(s.get("correct_count", 0) for s in sessions)
-    
+    # Totals cover every session and are summed by Postgres; only the page of sessions is shipped
+    if (pool := get_db_pool()) is not None:
+        rows, totals = await asyncio.gather(
+            pool.fetch(
+                "SELECT * FROM practice_sessions WHERE user_id = $1"
+                " ORDER BY session_date DESC LIMIT $2 OFFSET $3",
+                user.id, limit, offset,
+            ),
+            pool.fetchrow(PROGRESS_TOTALS_SQL, user.id),
+        )
+        sessions = [dict(r) for r in rows]
+        totals = dict(totals)
+    else:
+        # RLS ensures we only get our own sessions
+        res, totals_res = await asyncio.gather(
+            asyncio.to_thread(
+                supabase.table("practice_sessions").select("*")
+                .order("session_date", desc=True).range(offset, offset + limit - 1).execute
+            ),
+            asyncio.to_thread(supabase.rpc("progress_totals", {}).execute),
+        )
+        sessions = res.data or []
+        totals = totals_res.data[0] if totals_res.data else {}
+
     return {
         "sessions": sessions,
-        "questionsAttempted": total_q,
-        "questionsMastered": correct
+        "questionsAttempted": totals.get("attempted") or 0,
+        "questionsMastered": totals.get("mastered") or 0
     }
 
 @app.get("/progress/exam/{exam_id}")
-def get_exam_progress(exam_id: str, dep: tuple = Depends(get_supabase)):
+@cached_per_user("progress")
+async def get_exam_progress(exam_id: uuid.UUID, dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
-    res = supabase.table("practice_sessions").select("*").eq("exam_id", exam_id).order("session_date", desc=True).execute()
+    if (pool := get_db_pool()) is not None:
+        rows = await pool.fetch(
+            "SELECT * FROM practice_sessions WHERE user_id = $1 AND exam_id = $2 ORDER BY session_date DESC",
+            user.id, str(exam_id),
+        )
+        return [dict(r) for r in rows]
+    res = await asyncio.to_thread(
+        supabase.table("practice_sessions").select("*").eq("exam_id", str(exam_id)).order("session_date", desc=True).execute
+    )
     return res.data or []
 
 # --- Study Guide / Topic Summary Endpoints ---
 
 @app.get("/topics")
-def list_available_topics(dep: tuple = Depends(get_supabase)):
+@cached_per_user("topics")
+async def list_available_topics(dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
-    res = supabase.table("questions").select("topic").execute()
-    topics = sorted(list(set(q["topic"] for q in res.data if q.get("topic"))))
-    return topics
+    # Postgres de-duplicates and sorts; COLLATE "C" keeps the code-point order sorted() gave
+    if (pool := get_db_pool()) is not None:
+        rows = await pool.fetch(TOPICS_SQL, user.id)
+    else:
+        rows = (await asyncio.to_thread(supabase.rpc("list_topics", {}).execute)).data or []
+    return [r["topic"] for r in rows]
 
 @app.post("/study-guides/generate")
 @limiter.limit("10/hour")
-async def generate_study_guide(request: Request, body: Dict[str, Any], dep: tuple = Depends(get_supabase)):
+async def generate_study_guide(request: Request, body: GenerateStudyGuideRequest, dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
-    topic = body.get("topic")
+    topic = body.topic
     if not topic:
         raise HTTPException(status_code=400, detail="Topic required")
 
-    # Fetch questions for context (RLS applies)
-    q_res = supabase.table("questions").select("*").eq("topic", topic).limit(15).execute()
-    if not q_res.data:
+    # Fetch questions for context: only the columns the prompt and source_exam_ids use,
+    # matched on the (user_id, topic) index
+    if (pool := get_db_pool()) is not None:
+        rows = await pool.fetch(
+            "SELECT exam_id, question_text, solution FROM questions WHERE user_id = $1 AND topic = $2 LIMIT 15",
+            user.id, topic,
+        )
+    else:
+        # RLS applies
+        rows = (await asyncio.to_thread(
+            supabase.table("questions").select("exam_id,question_text,solution").eq("topic", topic).limit(15).execute
+        )).data
+    if not rows:
          raise HTTPException(status_code=404, detail="No questions found for this topic.")
 
-    questions_context = ""
-    for q in q_res.data:
-        questions_context += f"Q: {q['question_text']}\nA: {q['solution']}\n\n"
+    questions_context = "".join(f"Q: {q['question_text']}\nA: {q['solution']}\n\n" for q in rows)
+    source_exam_ids = list({q["exam_id"] for q in rows if q.get("exam_id")})
 
     try:
         print(f"Generating study guide for {topic} using {TUTOR_MODEL}...")
-        response = client.chat.completions.create(
+        response = get_llm_client().chat.completions.create(
             model=TUTOR_MODEL,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
-                {"role": "user", "content": STUDY_GUIDE_PROMPT.format(topic=topic, questions=questions_context)}
+                {"role": "system", "content": STUDY_GUIDE_SYSTEM_MESSAGE},
+                {"role": "user", "content": f'Topic: "{topic}"\n\nQUESTIONS ABOUT THIS TOPIC:\n{questions_context}'}
             ],
             response_format={"type": "json_object"}
         )
@@ -916,23 +1600,40 @@ async def generate_study_guide(request: Request, body: Dict[str, Any], dep: tupl
             "common_mistakes": guide_data.get("commonMistakes"),
             "example_questions": guide_data.get("exampleProblems"),
             "point_strategy": guide_data.get("point_strategy"),
-            "quick_tips": guide_data.get("quickTips")
+            "quick_tips": guide_data.get("quickTips"),
+            "source_exam_ids": source_exam_ids,
         }
         res = supabase.table("topic_summaries").upsert(db_data, on_conflict="user_id, topic").execute()
+        await invalidate_user_cache(user.id, "guides")
         return res.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/study-guides")
-def list_study_guides(dep: tuple = Depends(get_supabase)):
+@cached_per_user("guides")
+async def list_study_guides(dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
-    res = supabase.table("topic_summaries").select("id, topic, subject, created_at").order("updated_at", desc=True).execute()
+    if (pool := get_db_pool()) is not None:
+        rows = await pool.fetch(
+            "SELECT id, topic, subject, created_at FROM topic_summaries WHERE user_id = $1 ORDER BY updated_at DESC",
+            user.id,
+        )
+        return [dict(r) for r in rows]
+    res = await asyncio.to_thread(
+        supabase.table("topic_summaries").select("id, topic, subject, created_at").order("updated_at", desc=True).execute
+    )
     return res.data or []
 
 @app.get("/study-guides/{id}")
-def get_study_guide(id: str, dep: tuple = Depends(get_supabase)):
+@cached_per_user("guides")
+async def get_study_guide(id: uuid.UUID, dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
-    res = supabase.table("topic_summaries").select("*").eq("id", id).execute()
+    if (pool := get_db_pool()) is not None:
+        row = await pool.fetchrow("SELECT * FROM topic_summaries WHERE id = $1 AND user_id = $2", str(id), user.id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Guide not found")
+        return dict(row)
+    res = await asyncio.to_thread(supabase.table("topic_summaries").select("*").eq("id", str(id)).execute)
     if not res.data:
         raise HTTPException(status_code=404, detail="Guide not found")
     return res.data[0]
@@ -949,6 +1650,8 @@ async def delete_exam(exam_id: str, dep: tuple = Depends(get_supabase)):
     
     # 2. Delete (Cascade handled by DB or explicit if needed)
     supabase.table("exams").delete().eq("id", exam_id).execute()
+    await _invalidate_solution(user.id, exam_id)
+    await invalidate_user_cache(user.id, "exams", "topics", "progress")
     
     # 3. Storage cleanup (service key needed for storage delete usually if owner check is complex)
     try:
@@ -962,6 +1665,7 @@ async def delete_study_guide(id: str, dep: tuple = Depends(get_supabase)):
     supabase, user, _ = dep
     # This will delete the topic summary. RLS ensures user only deletes their own.
     supabase.table("topic_summaries").delete().eq("id", id).execute()
+    await invalidate_user_cache(user.id, "guides")
     return {"message": "Study guide deleted"}
 
 @app.post("/fachgespraech")
@@ -971,14 +1675,17 @@ async def chat_fachgespraech(request: Request, body: FachgespraechRequest, dep:
     topic = body.context_topic or "Allgemeine Elektrotechnik"
     
     try:
-        messages = [{"role": "system", "content": FACHGESPRAECH_SYSTEM_PROMPT.format(topic=topic)}]
+        messages = [
+            {"role": "system", "content": FACHGESPRAECH_SYSTEM_PROMPT},
+            {"role": "system", "content": f"CURRENT CONTEXT:\nTopic: {topic}"},
+        ]
         for msg in body.messages:
             messages.append({
                 "role": "user" if msg.role == "user" else "assistant",
                 "content": msg.content
             })
 
-        response = client.chat.completions.create(
+        response = get_llm_client().chat.completions.create(
             model=TUTOR_MODEL,
             messages=messages
         )
@@ -987,4 +1694,20 @@ async def chat_fachgespraech(request: Request, body: FachgespraechRequest, dep:
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # uvloop + httptools (from uvicorn[standard]) replace the stock asyncio loop and h11 parser.
+    # Set UVICORN_RELOAD=1 for local development (reload only works with a single worker).
+    reload = os.environ.get("UVICORN_RELOAD") == "1"
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", 8000)),
+        loop="uvloop",
+        http="httptools",
+        # A single worker by default; WEB_CONCURRENCY adds more (see its definition)
+        workers=1 if reload else WEB_CONCURRENCY,
+        # Past this many open connections/requests per worker uvicorn answers 503
+        # instead of queueing without bound
+        limit_concurrency=int(os.environ.get("UVICORN_LIMIT_CONCURRENCY", 1000)),
+        timeout_keep_alive=int(os.environ.get("UVICORN_KEEP_ALIVE", 30)),
+        reload=reload,
+    )
@@ -16,6 +16,9 @@ CREATE TABLE IF NOT EXISTS exams (
     specialization TEXT
 );
 
+-- Exam list is filtered by owner (RLS) and sorted newest first
+CREATE INDEX IF NOT EXISTS exams_user_id_upload_date_idx ON exams (user_id, upload_date DESC);
+
 -- Table: study_plans
 CREATE TABLE IF NOT EXISTS study_plans (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -23,9 +26,14 @@ CREATE TABLE IF NOT EXISTS study_plans (
     exam_id UUID UNIQUE REFERENCES exams(id) ON DELETE CASCADE,
     raw_json JSONB,
     markdown_plan TEXT,
+    content_hash TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Exact-match cache: the backend reuses a user's earlier analysis of identical PDF text
+ALTER TABLE study_plans ADD COLUMN IF NOT EXISTS content_hash TEXT;
+CREATE INDEX IF NOT EXISTS study_plans_user_id_content_hash_idx ON study_plans (user_id, content_hash);
+
 -- Table: practice_sessions
 CREATE TABLE IF NOT EXISTS practice_sessions (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -131,6 +139,102 @@ CREATE TRIGGER update_topic_summaries_modtime
     FOR EACH ROW
     EXECUTE PROCEDURE update_updated_at_column();
 
+-- Older databases were created without UNIQUE(exam_id) on study_plans; finalize_exam
+-- upserts on it, so add it (keeping the newest plan per exam) where it is missing.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey)
+        WHERE c.conrelid = 'study_plans'::regclass AND c.contype = 'u'
+          AND array_length(c.conkey, 1) = 1 AND a.attname = 'exam_id'
+    ) THEN
+        DELETE FROM study_plans a USING study_plans b
+        WHERE a.exam_id = b.exam_id AND (a.created_at, a.id) < (b.created_at, b.id);
+        ALTER TABLE study_plans ADD CONSTRAINT study_plans_exam_id_key UNIQUE (exam_id);
+    END IF;
+END $$;
+
+-- Function: finalize_exam
+-- Persists the AI analysis of an exam in one call/transaction (used by the backend's
+-- process_exam_background): study plan, exam status + metadata, scenarios and questions.
+-- p_content_hash keys the plan for the backend's exact-match analysis cache.
+DROP FUNCTION IF EXISTS finalize_exam(UUID, UUID, JSONB);
+CREATE OR REPLACE FUNCTION finalize_exam(p_exam_id UUID, p_user_id UUID, p_raw_json JSONB, p_content_hash TEXT DEFAULT NULL)
+RETURNS VOID AS $$
+DECLARE
+    v_specialization TEXT;
+    v_scenario JSONB;
+    v_scenario_id UUID;
+    v_scenario_map JSONB := '{}'::jsonb;
+BEGIN
+    INSERT INTO study_plans (exam_id, user_id, raw_json, markdown_plan, content_hash)
+    VALUES (p_exam_id, p_user_id, p_raw_json, COALESCE(p_raw_json->>'summary', 'Processed successfully'), p_content_hash)
+    ON CONFLICT (exam_id) DO UPDATE SET
+        user_id = EXCLUDED.user_id,
+        raw_json = EXCLUDED.raw_json,
+        markdown_plan = EXCLUDED.markdown_plan,
+        content_hash = EXCLUDED.content_hash;
+
+    SELECT specialization INTO v_specialization FROM user_settings WHERE user_id = p_user_id;
+
+    UPDATE exams SET
+        status = 'completed',
+        qualification_area = p_raw_json->>'qualificationArea',
+        handlungsbereich = p_raw_json->>'handlungsbereich',
+        specialization = v_specialization
+    WHERE id = p_exam_id;
+
+    -- Clear any prior scenarios/questions so retries are idempotent
+    DELETE FROM questions WHERE exam_id = p_exam_id;
+    DELETE FROM scenarios WHERE exam_id = p_exam_id;
+
+    FOR v_scenario IN SELECT * FROM jsonb_array_elements(COALESCE(p_raw_json->'scenarios', '[]'::jsonb)) LOOP
+        INSERT INTO scenarios (exam_id, user_id, context_text, "order")
+        VALUES (p_exam_id, p_user_id, v_scenario->>'contextText', COALESCE((v_scenario->>'index')::numeric::int, 0))
+        RETURNING id INTO v_scenario_id;
+        IF v_scenario->>'index' IS NOT NULL THEN
+            v_scenario_map := v_scenario_map || jsonb_build_object(v_scenario->>'index', v_scenario_id);
+        END IF;
+    END LOOP;
+
+    INSERT INTO questions (
+        exam_id, user_id, scenario_id, question_number, question_text, type, qualification_area,
+        subject, topic, solution, explanation, points_total, points_breakdown
+    )
+    SELECT
+        p_exam_id, p_user_id,
+        (v_scenario_map->>(q->>'scenarioIndex'))::uuid,
+        q->>'questionNumber', q->>'questionText', q->>'type', q->>'qualificationArea',
+        q->>'subject', q->>'topic', q->>'solution', q->>'explanation',
+        (q->'points'->>'total')::numeric::int,
+        q->'points'->'breakdown'
+    FROM jsonb_array_elements(COALESCE(p_raw_json->'questions', '[]'::jsonb)) AS q;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the backend (service role) may finalize exams
+REVOKE EXECUTE ON FUNCTION finalize_exam(UUID, UUID, JSONB, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION finalize_exam(UUID, UUID, JSONB, TEXT) TO service_role;
+
+-- Topic list and progress totals are aggregated here rather than in the API.
+-- Both run as the caller (SECURITY INVOKER), so RLS limits them to the user's own rows.
+CREATE INDEX IF NOT EXISTS questions_user_id_topic_idx ON questions (user_id, topic);
+
+CREATE OR REPLACE FUNCTION list_topics()
+RETURNS TABLE (topic TEXT) AS $$
+    SELECT q.topic FROM questions q
+    WHERE q.user_id = auth.uid() AND q.topic <> ''
+    GROUP BY q.topic
+    ORDER BY q.topic COLLATE "C";
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION progress_totals()
+RETURNS TABLE (attempted BIGINT, mastered BIGINT) AS $$
+    SELECT COALESCE(SUM(total_questions), 0), COALESCE(SUM(correct_count), 0)
+    FROM practice_sessions WHERE user_id = auth.uid();
+$$ LANGUAGE sql STABLE;
+
 -- --- AUTOMATED MAINTENANCE CRON ---
 -- Runs every 5 minutes to sweep stuck processing tasks
 -- Fails any exam in 'processing' state for more than 15 minutes
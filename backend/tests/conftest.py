@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# main.py reads its config at import time; the tests never reach Supabase or the LLM
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("CHATLLM_API_KEY", "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _shutdown_pdf_pool():
+    yield
+    import main
+
+    if main.get_pdf_pool.cache_info().currsize:
+        main.get_pdf_pool().shutdown()
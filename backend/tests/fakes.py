@@ -0,0 +1,115 @@
+"""In-memory stand-ins for the Supabase client, enough for the endpoints under test."""
+from types import SimpleNamespace
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = {}
+        self.op = "select"
+        self.values = None
+        self.one = False
+        self.excluded = {}
+        self.not_null = set()
+        self.ordering = None
+        self.offset = 0
+        self.max_rows = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def neq(self, column, value):
+        self.excluded[column] = value
+        return self
+
+    @property
+    def not_(self):
+        return _Negated(self)
+
+    def order(self, column, desc=False):
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def range(self, start, end):
+        self.offset, self.max_rows = start, end - start + 1
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    def update(self, values):
+        self.op, self.values = "update", values
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def _matches(self, row):
+        return (
+            all(row.get(k) == v for k, v in self.filters.items())
+            and all(row.get(k) != v for k, v in self.excluded.items())
+            and all(row.get(k) is not None for k in self.not_null)
+        )
+
+    def execute(self):
+        rows = self.db.tables.setdefault(self.table, [])
+        hits = [row for row in rows if self._matches(row)]
+        if self.op == "update":
+            for row in hits:
+                row.update(self.values)
+        elif self.op == "delete":
+            self.db.tables[self.table] = [row for row in rows if not self._matches(row)]
+        if self.ordering:
+            column, desc = self.ordering
+            hits.sort(key=lambda row: row.get(column), reverse=desc)
+        if self.max_rows is not None:
+            hits = hits[self.offset:self.offset + self.max_rows]
+        if self.one:
+            return SimpleNamespace(data=hits[0] if hits else None)
+        return SimpleNamespace(data=hits)
+
+
+class _Negated:
+    """`query.not_.is_(column, "null")`, the only negation the backend uses."""
+
+    def __init__(self, query):
+        self.query = query
+
+    def is_(self, column, value):
+        assert value == "null"
+        self.query.not_null.add(column)
+        return self.query
+
+
+class FakeBucket:
+    def download(self, path):
+        return b"%PDF-1.4 fake"
+
+    def remove(self, paths):
+        return []
+
+
+class FakeSupabase:
+    def __init__(self, **tables):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in tables.items()}
+        self.storage = SimpleNamespace(from_=lambda bucket: FakeBucket())
+        self.rpc_calls = []
+        self.rpc_results = {}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        self.rpc_calls.append((name, params))
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=self.rpc_results.get(name)))
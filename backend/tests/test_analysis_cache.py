@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+import main
+from fakes import FakeSupabase
+
+RAW_TEXT = "1. Erklären Sie den Aufbau eines Transformators.\n2. Nennen Sie drei Schutzarten.\n"
+HASH = main._exam_content_hash(RAW_TEXT)
+GOOD = {"title": "Earlier analysis", "questions": [{"questionNumber": "1"}]}
+
+
+def _plan(exam_id, raw_json, user_id="user-1", content_hash=HASH, created_at="2026-01-01"):
+    return {"exam_id": exam_id, "user_id": user_id, "raw_json": raw_json,
+            "content_hash": content_hash, "created_at": created_at}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    db = FakeSupabase(study_plans=[], exams=[])
+    monkeypatch.setattr(main, "get_supabase_service", lambda: db)
+    return db
+
+
+def test_finds_the_users_earlier_analysis(service):
+    service.tables["study_plans"] = [
+        _plan("old", GOOD),
+        _plan("other-user", {"questions": [{"questionNumber": "9"}]}, user_id="user-2"),
+        _plan("other-text", {"questions": [{"questionNumber": "8"}]}, content_hash="different"),
+    ]
+    assert main._find_cached_analysis("user-1", HASH, "new") == GOOD
+
+
+def test_skips_the_exams_own_plan_and_empty_analyses(service):
+    service.tables["study_plans"] = [
+        _plan("new", GOOD, created_at="2026-03-01"),  # a retry must not reuse its own result
+        _plan("empty", {"title": "Nothing found", "questions": []}, created_at="2026-02-01"),
+        _plan("unparsed", {}, created_at="2026-02-02"),
+        _plan("null", None, created_at="2026-02-03"),
+    ]
+    assert main._find_cached_analysis("user-1", HASH, "new") is None
+
+    service.tables["study_plans"].append(_plan("old", GOOD, created_at="2026-01-01"))
+    assert main._find_cached_analysis("user-1", HASH, "new") == GOOD
+
+
+class FakeLLM:
+    def __init__(self, content):
+        self.content = content
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))],
+            usage=SimpleNamespace(prompt_tokens=None),
+        )
+
+
+@pytest.fixture
+def pipeline(monkeypatch, service, tmp_path):
+    async def extract_pdf_text(file_path):
+        return RAW_TEXT
+
+    monkeypatch.setattr(main, "extract_pdf_text", extract_pdf_text)
+    monkeypatch.setattr(main, "_redis", None)
+    pdf = tmp_path / "exam.pdf"
+
+    def run(llm_output):
+        llm = FakeLLM(orjson.dumps(llm_output).decode())
+        monkeypatch.setattr(main, "get_async_llm_client", lambda: llm)
+        pdf.write_bytes(b"%PDF-")
+        asyncio.run(main._process_exam("new", str(pdf), "user-1", "token"))
+        name, params = service.rpc_calls[-1]
+        assert name == "finalize_exam"
+        return llm, params
+
+    return run
+
+
+def test_cache_hit_skips_the_llm(service, pipeline):
+    service.tables["study_plans"] = [_plan("old", GOOD)]
+    llm, params = pipeline({"questions": [{"questionNumber": "1"}]})
+
+    assert llm.prompts == []
+    assert params["p_raw_json"] == GOOD
+    assert params["p_content_hash"] == HASH
+
+
+def test_fresh_analysis_is_stored_with_its_hash(service, pipeline):
+    llm, params = pipeline({"title": "Fresh", "questions": [{"questionNumber": "1"}]})
+
+    assert len(llm.prompts) == 1
+    assert params["p_raw_json"]["title"] == "Fresh"
+    assert params["p_content_hash"] == HASH
+
+
+@pytest.mark.parametrize("llm_output", [{"title": "Nothing", "questions": []}, {}])
+def test_empty_analysis_is_stored_without_a_hash(service, pipeline, llm_output):
+    _, params = pipeline(llm_output)
+
+    assert params["p_content_hash"] is None
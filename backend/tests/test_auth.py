@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import main
+
+
+class FakeAuth:
+    def get_user(self, token):
+        if token != "valid-token":
+            raise RuntimeError("invalid JWT")
+        return SimpleNamespace(user=SimpleNamespace(id="user-1"))
+
+
+class FakeClient:
+    def __init__(self):
+        self.auth = FakeAuth()
+        self.postgrest = SimpleNamespace(auth=lambda token: None)
+        self.options = SimpleNamespace(headers={})
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    built = []
+
+    def create_client(url, key, options=None):
+        built.append(FakeClient())
+        return built[-1]
+
+    monkeypatch.setattr(main, "create_client", create_client)
+    monkeypatch.setattr(main, "_user_clients", main.TTLCache(maxsize=4, ttl=60))
+    return built
+
+
+def _authenticate(token):
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(main.get_supabase(creds))
+
+
+def test_verified_clients_are_reused(clients):
+    first, user, _ = _authenticate("valid-token")
+    second, _, _ = _authenticate("valid-token")
+
+    assert user.id == "user-1"
+    assert first is second
+    assert len(clients) == 1
+
+
+def test_rejected_tokens_are_not_cached(clients):
+    _authenticate("valid-token")
+    for i in range(10):
+        with pytest.raises(HTTPException) as exc:
+            _authenticate(f"garbage-{i}")
+        assert exc.value.status_code == 401
+
+    assert list(main._user_clients) == ["valid-token"]
+    _authenticate("valid-token")
+    assert len(clients) == 11  # the real session's client survived the garbage
@@ -0,0 +1,117 @@
+"""The asyncpg read path must return what the PostgREST path returns for the same rows."""
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import main
+from fakes import FakeSupabase
+
+USER = SimpleNamespace(id="5b0c8b0e-8f4e-4c55-9a1a-2b7c1f0e6d11")
+EXAM_ID = "0d6f1c52-3b8e-4f0a-8c55-6e1f4d2a9b77"
+UTC = datetime.timezone.utc
+
+# Rows as asyncpg decodes them (uuid codec -> str, timestamptz -> aware datetime)
+EXAMS = [
+    {"id": EXAM_ID, "filename": "fruehjahr.pdf", "status": "completed",
+     "upload_date": datetime.datetime(2026, 3, 1, 10, 0, 0, 123456, tzinfo=UTC), "error_message": None},
+    {"id": "9a4e2f11-0c3b-4d8e-b1f2-7a6c5d4e3f21", "filename": "herbst.pdf", "status": "failed",
+     "upload_date": datetime.datetime(2025, 10, 2, 8, 30, tzinfo=UTC), "error_message": "Zeitüberschreitung"},
+]
+SESSIONS = [
+    {"id": "3f1e2d4c-5b6a-4789-8a7b-6c5d4e3f2a10", "user_id": USER.id, "exam_id": EXAM_ID,
+     "exam_name": "fruehjahr.pdf", "session_date": datetime.datetime(2026, 3, 2, 18, 5, tzinfo=UTC),
+     "total_questions": 12, "correct_count": 9, "incorrect_count": 3, "score_percentage": 75},
+]
+GUIDES = [
+    {"id": "7c6b5a49-3827-4165-9f8e-7d6c5b4a3928", "topic": "Schutzmaßnahmen", "subject": "NTG",
+     "created_at": datetime.datetime(2026, 2, 1, tzinfo=UTC)},
+]
+
+
+def _as_postgrest(rows):
+    """The same rows as PostgREST sends them: timestamps as ISO 8601 strings."""
+    return [
+        {k: v.isoformat() if isinstance(v, datetime.datetime) else v for k, v in row.items()}
+        for row in rows
+    ]
+
+
+class FakePool:
+    """Answers by the table a query reads; records every query for the user-filter check."""
+
+    def __init__(self):
+        self.queries = []
+
+    def _rows(self, query):
+        if "FROM exams" in query:
+            return EXAMS
+        if "FROM practice_sessions" in query:
+            return SESSIONS
+        if "FROM questions" in query:
+            return [{"topic": "Elektrische Maschinen"}, {"topic": "Schutzmaßnahmen"}]
+        if "FROM topic_summaries" in query:
+            return GUIDES
+        raise AssertionError(f"unexpected query: {query}")
+
+    async def fetch(self, query, *args):
+        self.queries.append((query, args))
+        return self._rows(query)
+
+    async def fetchrow(self, query, *args):
+        self.queries.append((query, args))
+        if "SUM(" in query:
+            return {"attempted": 12, "mastered": 9}
+        rows = self._rows(query)
+        return rows[0] if rows else None
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    db = FakeSupabase(
+        exams=_as_postgrest(EXAMS),
+        practice_sessions=_as_postgrest(SESSIONS),
+        topic_summaries=_as_postgrest(GUIDES),
+    )
+    db.rpc_results = {
+        "progress_totals": [{"attempted": 12, "mastered": 9}],
+        "list_topics": [{"topic": "Elektrische Maschinen"}, {"topic": "Schutzmaßnahmen"}],
+    }
+    monkeypatch.setattr(main, "_redis", None)
+    main.app.dependency_overrides[main.get_supabase] = lambda: (db, USER, "token")
+    yield db
+    main.app.dependency_overrides.clear()
+
+
+def _get(path):
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+    return asyncio.run(go())
+
+
+@pytest.mark.parametrize("path", [
+    "/exams",
+    "/progress",
+    f"/progress/exam/{EXAM_ID}",
+    "/topics",
+    "/study-guides",
+    f"/study-guides/{GUIDES[0]['id']}",
+])
+def test_pool_and_postgrest_paths_return_the_same_body(monkeypatch, supabase, path):
+    monkeypatch.setattr(main, "_db_pool", None)
+    via_postgrest = _get(path)
+    pool = FakePool()
+    monkeypatch.setattr(main, "_db_pool", pool)
+    via_pool = _get(path)
+
+    assert via_postgrest.status_code == via_pool.status_code == 200
+    assert via_pool.json() == via_postgrest.json()
+    # The pool bypasses RLS, so every query must be scoped to the caller
+    assert pool.queries
+    for query, args in pool.queries:
+        assert "user_id = $" in query
+        assert USER.id in args
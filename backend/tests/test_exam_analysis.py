@@ -0,0 +1,44 @@
+import orjson
+
+import main
+
+
+def _analysis(payload):
+    return main.parse_exam_analysis(orjson.dumps(payload).decode())
+
+
+def test_valid_output_keeps_only_what_the_model_sent():
+    result = _analysis({
+        "subject": "NTG",
+        "questions": [{"questionNumber": "1", "points": {"total": 4, "breakdown": [{"step": "Formel", "pts": 2}]}}],
+    })
+
+    assert result == {
+        "subject": "NTG",
+        "questions": [{"questionNumber": "1", "points": {"total": 4, "breakdown": [{"step": "Formel", "pts": 2}]}}],
+    }
+
+
+def test_numbers_are_coerced_to_strings_where_the_schema_wants_text():
+    result = _analysis({"year": 2024, "questions": [{"questionNumber": 3, "points": {"total": 2.5}}]})
+
+    assert result["year"] == "2024"
+    assert result["questions"][0]["questionNumber"] == "3"
+    assert result["questions"][0]["points"]["total"] == 2.5
+
+
+def test_unknown_fields_are_kept():
+    result = _analysis({"examDate": "Frühjahr", "questions": [{"questionNumber": "1", "hint": "Ohm"}]})
+
+    assert result["examDate"] == "Frühjahr"
+    assert result["questions"][0]["hint"] == "Ohm"
+
+
+def test_schema_violations_fall_back_to_lenient_parsing():
+    text = '{"title": "Exam", "questions": "none found"}'
+    assert main.parse_exam_analysis(text) == {"title": "Exam", "questions": "none found"}
+
+
+def test_non_json_output_is_recovered_from_markdown():
+    text = 'Here you go:\n```json\n{"subject": "NTG", "questions": []}\n```'
+    assert main.parse_exam_analysis(text) == {"subject": "NTG", "questions": []}
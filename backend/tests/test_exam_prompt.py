@@ -0,0 +1,57 @@
+import orjson
+import pytest
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def small_budget(monkeypatch):
+    monkeypatch.setattr(main, "EXAM_INPUT_TOKEN_BUDGET", main._estimate_tokens(main.EXAM_SYSTEM_MESSAGE) + 20_000)
+    monkeypatch.setattr(main, "_chars_per_token", 3.0)
+    monkeypatch.setattr(main, "MIN_PRE_EXTRACT_CHARS", 0)
+
+
+def _exam(n_questions):
+    return "".join(
+        f"{i}. Erklären Sie die Schutzmaßnahme Nummer {i} für das Netz. " + "Kontext " * 40 + "\n"
+        for i in range(1, n_questions + 1)
+    )
+
+
+def _split(prompt):
+    candidates, text = prompt.split("--- RAW TEXT (verify and find any missed questions) ---\n")
+    return orjson.loads(candidates.split("---\n", 1)[1]), text
+
+
+def test_short_exam_is_sent_whole():
+    raw_text = _exam(5)
+    candidates, text = _split(main._build_exam_prompt("e", raw_text, main.pre_extract_questions(raw_text)))
+
+    assert text.strip() == raw_text.strip()
+    assert [c["questionNumber"] for c in candidates] == ["1", "2", "3", "4", "5"]
+
+
+def test_long_exam_keeps_its_final_questions():
+    raw_text = _exam(400)
+    candidates = main.pre_extract_questions(raw_text)
+    prompt = main._build_exam_prompt("e", raw_text, candidates)
+    kept, text = _split(prompt)
+
+    assert len(raw_text) > 2 * 20_000 * 3.0  # far over budget
+    assert main._estimate_tokens(main.EXAM_SYSTEM_MESSAGE + prompt) <= main.EXAM_INPUT_TOKEN_BUDGET + 10
+    # The raw text keeps most of the budget and starts at the beginning of the exam
+    assert len(text) >= 0.75 * 20_000 * 3.0
+    assert text.startswith("1. Erklären Sie")
+    # The questions past the text cut still reach the model as candidates
+    covered = {c["questionNumber"] for c in kept}
+    assert "400" in covered
+    for i in (1, 2, 399, 400):
+        assert f"{i}. Erklären Sie" in text or str(i) in covered
+
+
+def test_candidates_stay_within_their_share():
+    raw_text = _exam(400)
+    prompt = main._build_exam_prompt("e", raw_text, main.pre_extract_questions(raw_text))
+    candidates_part, _ = prompt.split("--- RAW TEXT")
+
+    assert main._estimate_tokens(candidates_part) <= 0.2 * 20_000 + 10
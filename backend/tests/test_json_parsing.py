@@ -0,0 +1,33 @@
+import main
+
+
+def test_bare_json():
+    assert main.parse_json_from_markdown('{"title": "Exam", "questions": []}') == {
+        "title": "Exam",
+        "questions": [],
+    }
+
+
+def test_json_fence():
+    text = 'Here is the analysis:\n```json\n{"title": "Exam", "topics": ["NTG"]}\n```\nDone.'
+    assert main.parse_json_from_markdown(text) == {"title": "Exam", "topics": ["NTG"]}
+
+
+def test_bare_fence():
+    text = '```\n{"title": "Exam"}\n```'
+    assert main.parse_json_from_markdown(text) == {"title": "Exam"}
+
+
+def test_object_embedded_in_prose():
+    text = 'Sure! {"title": "Exam", "summary": {"text": "nested"}} Let me know.'
+    assert main.parse_json_from_markdown(text) == {"title": "Exam", "summary": {"text": "nested"}}
+
+
+def test_unrecoverable_text_gives_empty_dict():
+    assert main.parse_json_from_markdown("no json here") == {}
+    assert main.parse_json_from_markdown("```json\n{broken\n```") == {}
+
+
+def test_parse_exam_analysis_falls_back_to_lenient_parsing():
+    text = '```json\n{"title": "Exam", "questions": [{"unexpected": true}]}\n```'
+    assert main.parse_exam_analysis(text)["title"] == "Exam"
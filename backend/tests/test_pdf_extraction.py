@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+pymupdf = pytest.importorskip("pymupdf")
+
+import main
+
+
+@pytest.fixture
+def long_pdf(tmp_path):
+    path = tmp_path / "long.pdf"
+    doc = pymupdf.open()
+    for i in range(114):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1}: question text for page {i + 1}.")
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    monkeypatch.setattr(main, "PDF_PAGES_PER_CHUNK", 10)
+    monkeypatch.setattr(main, "PDF_POOL_WORKERS", 3)
+    main.get_pdf_pool.cache_clear()
+    yield
+    main.get_pdf_pool().shutdown()
+    main.get_pdf_pool.cache_clear()
+
+
+def test_parallel_extraction_matches_single_pass_when_budget_runs_out(long_pdf, small_pool):
+    max_chars = 1000
+    parallel = asyncio.run(main.extract_pdf_text(long_pdf, max_chars))
+    single = main.extract_text_from_pdf(long_pdf, max_chars)
+
+    assert parallel == single
+    assert len(parallel) <= max_chars
+    assert parallel.startswith("Page 1:")
+    assert "Page 114:" not in parallel
+
+
+def test_parallel_extraction_matches_single_pass_for_whole_document(long_pdf, small_pool):
+    parallel = asyncio.run(main.extract_pdf_text(long_pdf))
+    single = main.extract_text_from_pdf(long_pdf)
+
+    assert parallel == single
+    assert "Page 114:" in parallel
@@ -0,0 +1,111 @@
+import importlib.util
+import sys
+
+import pytest
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def no_min_length(monkeypatch):
+    # Most texts here are far below the production cutoff; its own test restores it
+    monkeypatch.setattr(main, "MIN_PRE_EXTRACT_CHARS", 0)
+
+
+def test_splits_on_question_anchors():
+    text = (
+        "1. Explain Ohm's law in your own words.\n"
+        "Q2) Define the term reactive power.\n"
+        "Question 3. Is a fuse a protective device? True or False\n"
+    )
+    candidates = main.pre_extract_questions(text)
+
+    assert [c.questionNumber for c in candidates] == ["1", "2", "3"]
+    assert candidates[0].questionText == "Explain Ohm's law in your own words."
+    assert candidates[1].questionText == "Define the term reactive power."
+    assert [c.type for c in candidates] == ["Essay", "Short Answer", "True/False"]
+    assert all(c.source == "regex" for c in candidates)
+
+
+def test_blank_line_runs_and_wrapped_bodies_collapse_to_single_spaces():
+    text = (
+        "1.   Explain how a transformer\n   works under load.\n\n\n\n"
+        "2.\n\nDefine the   term\tslip.\n\n"
+    )
+    candidates = main.pre_extract_questions(text)
+
+    assert [(c.questionNumber, c.questionText) for c in candidates] == [
+        ("1", "Explain how a transformer works under load."),
+        ("2", "Define the term slip."),
+    ]
+
+
+def test_short_fragments_are_skipped():
+    text = "1. Long enough\n2. Too short\n3. Name three types of electric motors.\n"
+    candidates = main.pre_extract_questions(text)
+
+    assert [c.questionNumber for c in candidates] == ["1", "3"]
+
+
+def test_stops_at_max_questions(monkeypatch):
+    monkeypatch.setattr(main, "MAX_QUESTIONS", 3)
+    text = "".join(f"{i}. Name the safety rule number {i} here.\n" for i in range(1, 11))
+    candidates = main.pre_extract_questions(text)
+
+    assert [c.questionNumber for c in candidates] == ["1", "2", "3"]
+
+
+def test_texts_below_min_pre_extract_chars_are_left_to_the_model(monkeypatch):
+    monkeypatch.setattr(main, "MIN_PRE_EXTRACT_CHARS", 2000)
+    question = "1. Explain the function of a residual current device in detail.\n"
+    short_text = question * ((2000 // len(question)) - 1)
+    long_text = question * ((2000 // len(question)) + 1)
+
+    assert len(short_text) < 2000 <= len(long_text)
+    assert main.pre_extract_questions(short_text) == []
+    assert main.pre_extract_questions(long_text)
+
+
+def test_classification_only_reads_the_question_head():
+    filler = "Name the parts of the switchgear shown in the figure " * 10
+    assert len(filler) > main.CLASSIFY_HEAD_CHARS
+
+    assert main._classify_question("A) copper B) aluminium " + filler) == "Multiple Choice"
+    # Option markers past the head are not seen; the leading keyword decides instead
+    assert main._classify_question(filler + "A) copper B) aluminium") == "Short Answer"
+    assert main._classify_question("x" * main.CLASSIFY_HEAD_CHARS + " Explain the circuit") == "Short Answer"
+    assert main._classify_question("x" * (main.CLASSIFY_HEAD_CHARS - 20) + " Explain it") == "Essay"
+
+
+def test_mcq_marker_beats_keywords():
+    assert main._classify_question("Explain which is right: a) 230 V b) 400 V") == "Multiple Choice"
+    assert main._classify_question("Explain and compare both circuits") == "Essay"
+
+
+UMLAUT_CASES = [
+    ("Explainé the circuit", "Short Answer"),
+    ("äExplain the circuit", "Short Answer"),
+    ("Define Explainé", "Short Answer"),
+    ("x éT/FéExplain Name", "Short Answer"),
+    ("Wie groß ist der Strom? True/Falseö Explain", "Essay"),
+    ("Erläutern Sie: Explain the Schütz", "Essay"),
+    ("Prüfung: True / False", "True/False"),
+]
+
+
+@pytest.fixture(params=["without re2", "with re2"])
+def fresh_main(request, monkeypatch):
+    """A separate copy of main imported with google-re2 hidden or present."""
+    if request.param == "with re2":
+        pytest.importorskip("re2")
+    else:
+        monkeypatch.setitem(sys.modules, "re2", None)
+    spec = importlib.util.spec_from_file_location("main_engine_check", main.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("text, expected", UMLAUT_CASES)
+def test_umlaut_adjacent_keywords_classify_the_same_with_or_without_re2(fresh_main, text, expected):
+    assert fresh_main._classify_question(text) == expected
@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+import main
+
+fakeredis = pytest.importorskip("fakeredis")
+
+DEP = (None, SimpleNamespace(id="user-1"), "token")
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(main, "_redis", client)
+    return client
+
+
+def _counting_endpoint(namespace, during_render=None):
+    calls = []
+
+    @main.cached_per_user(namespace)
+    async def endpoint(dep, limit: int = 10):
+        calls.append(limit)
+        if during_render is not None:
+            await during_render()
+        return {"call": len(calls), "limit": limit}
+
+    return endpoint, calls
+
+
+def _body(response):
+    return orjson.loads(response.body)
+
+
+def test_hits_are_served_from_redis_per_query(redis):
+    endpoint, calls = _counting_endpoint("exams")
+
+    async def go():
+        return [_body(await endpoint(dep=DEP, limit=limit)) for limit in (10, 10, 20)]
+
+    assert asyncio.run(go()) == [{"call": 1, "limit": 10}, {"call": 1, "limit": 10}, {"call": 2, "limit": 20}]
+    assert calls == [10, 20]
+
+
+def test_invalidation_bumps_only_the_given_namespaces(redis):
+    exams, exam_calls = _counting_endpoint("exams")
+    topics, topic_calls = _counting_endpoint("topics")
+
+    async def go():
+        await exams(dep=DEP)
+        await topics(dep=DEP)
+        await main.invalidate_user_cache("user-1", "exams")
+        await main.invalidate_user_cache("someone-else", "topics")
+        return _body(await exams(dep=DEP)), _body(await topics(dep=DEP))
+
+    assert asyncio.run(go()) == ({"call": 2, "limit": 10}, {"call": 1, "limit": 10})
+
+
+def test_body_rendered_before_an_invalidation_is_never_served(redis):
+    # The write lands after the invalidation that should have dropped it
+    endpoint, calls = _counting_endpoint("exams", lambda: main.invalidate_user_cache("user-1", "exams"))
+
+    async def go():
+        return [_body(await endpoint(dep=DEP)) for _ in range(2)]
+
+    assert [b["call"] for b in asyncio.run(go())] == [1, 2]
+
+
+def test_each_query_keeps_its_own_ttl(redis, monkeypatch):
+    monkeypatch.setattr(main, "RESPONSE_CACHE_TTL", 60)
+    endpoint, _ = _counting_endpoint("exams")
+
+    async def go():
+        await endpoint(dep=DEP, limit=10)
+        key = next(k for k in await redis.keys("resp:exams:*") if k.endswith(b"limit=10"))
+        await redis.expire(key, 5)
+        await endpoint(dep=DEP, limit=20)  # a new entry must not refresh the first one
+        return await redis.ttl(key)
+
+    assert asyncio.run(go()) <= 5
+
+
+def test_redis_outage_falls_back_to_the_endpoint(monkeypatch):
+    class BrokenRedis:
+        async def get(self, key):
+            raise ConnectionError("redis down")
+
+    monkeypatch.setattr(main, "_redis", BrokenRedis())
+    endpoint, calls = _counting_endpoint("exams")
+
+    assert _body(asyncio.run(endpoint(dep=DEP))) == {"call": 1, "limit": 10}
@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import main
+from fakes import FakeSupabase
+
+USER = SimpleNamespace(id="user-1")
+EXAM_ID = "exam-1"
+
+
+@pytest.fixture(params=["in-process", "redis"])
+def backend(request, monkeypatch):
+    if request.param == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        monkeypatch.setattr(main, "_redis", fakeredis.FakeAsyncRedis())
+    else:
+        monkeypatch.setattr(main, "_redis", None)
+    monkeypatch.setattr(main, "_solution_cache", main.TTLCache(maxsize=16, ttl=60))
+    return request.param
+
+
+@pytest.fixture
+def supabase(monkeypatch, tmp_path):
+    db = FakeSupabase(exams=[{"id": EXAM_ID, "user_id": USER.id, "storage_path": "u/exam.pdf"}])
+    db.solution = {"questions": [{"questionNumber": "1", "solution": "first"}]}
+    loads = []
+
+    def load_solution(client, exam_id):
+        loads.append(exam_id)
+        if not client.table("exams").select("*").eq("id", exam_id).execute().data:
+            raise HTTPException(status_code=404, detail="Exam not found or no access")
+        return db.solution
+
+    monkeypatch.setattr(main, "_load_solution", load_solution)
+    monkeypatch.setattr(main, "_enqueue_exam", lambda *args: None)
+    monkeypatch.setattr(main, "TEMP_DIR", str(tmp_path))
+    main.app.dependency_overrides[main.get_supabase] = lambda: (db, USER, "token")
+    db.loads = loads
+    yield db
+    main.app.dependency_overrides.clear()
+
+
+def _run(*requests):
+    """Issue (method, path, headers) requests in order on one event loop."""
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.request(method, path, headers=headers) for method, path, headers in requests]
+    return asyncio.run(go())
+
+
+def test_etag_revalidation_returns_304(backend, supabase):
+    (first,) = _run(("GET", f"/solutions/{EXAM_ID}", {}))
+    etag = first.headers["etag"]
+    (second,) = _run(("GET", f"/solutions/{EXAM_ID}", {"If-None-Match": etag}))
+    (other,) = _run(("GET", f"/solutions/{EXAM_ID}", {"If-None-Match": '"stale"'}))
+
+    assert first.status_code == 200
+    assert first.json() == supabase.solution
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert other.status_code == 200
+    assert supabase.loads == [EXAM_ID]  # rendered once, then served from the cache
+
+
+def test_retry_invalidates_the_cached_solution(backend, supabase):
+    (first,) = _run(("GET", f"/solutions/{EXAM_ID}", {}))
+    supabase.solution = {"questions": [{"questionNumber": "1", "solution": "second"}]}
+    retry, after = _run(
+        ("POST", f"/retry/{EXAM_ID}", {}),
+        ("GET", f"/solutions/{EXAM_ID}", {"If-None-Match": first.headers["etag"]}),
+    )
+
+    assert retry.status_code == 200
+    assert after.status_code == 200
+    assert after.json()["questions"][0]["solution"] == "second"
+    assert after.headers["etag"] != first.headers["etag"]
+
+
+def test_delete_invalidates_the_cached_solution(backend, supabase):
+    first, deleted, after = _run(
+        ("GET", f"/solutions/{EXAM_ID}", {}),
+        ("DELETE", f"/exams/{EXAM_ID}", {}),
+        ("GET", f"/solutions/{EXAM_ID}", {}),
+    )
+
+    assert first.status_code == 200
+    assert deleted.status_code == 200
+    assert after.status_code == 404
+
+
+def test_multiple_workers_without_redis_do_not_cache_in_process(monkeypatch, supabase):
+    monkeypatch.setattr(main, "_redis", None)
+    monkeypatch.setattr(main, "WEB_CONCURRENCY", 2)
+    (first,) = _run(("GET", f"/solutions/{EXAM_ID}", {}))
+    # Another worker reprocessed the exam; this one never saw the invalidation
+    supabase.solution = {"questions": [{"questionNumber": "1", "solution": "second"}]}
+    (after,) = _run(("GET", f"/solutions/{EXAM_ID}", {"If-None-Match": first.headers["etag"]}))
+
+    assert after.status_code == 200
+    assert after.json()["questions"][0]["solution"] == "second"